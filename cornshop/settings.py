@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "store.middleware.RequestMetricsMiddleware",
+    "store.routers.ReplicaPinMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -81,16 +83,101 @@ WSGI_APPLICATION = "cornshop.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections stay open per worker thread for DATABASE_CONN_MAX_AGE seconds
+# and are pinged before reuse. Threaded and ASGI servers should set
+# DATABASE_POOL_SIZE instead: each request then returns its connection to a
+# bounded pool shared by the process (see store.pool).
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.mysql",
+        "ENGINE": "store.backends.mysql",
         "NAME": "cornshop",
         "HOST": "localhost",
         "USER": "root",
         "PASSWORD": "edu@gmail1",
+        "CONN_MAX_AGE": (
+            0 if DATABASE_POOL_SIZE else int(os.environ.get("DATABASE_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": os.environ.get("DATABASE_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": (
+            {
+                "pool": {
+                    "max_size": DATABASE_POOL_SIZE,
+                    "timeout": int(os.environ.get("DATABASE_POOL_TIMEOUT", 10)),
+                }
+            }
+            if DATABASE_POOL_SIZE
+            else {}
+        ),
     }
 }
 
+# Read replicas of "default", as a comma-separated list of hosts. Each one
+# becomes a "replicaN" alias; store.routers sends catalogue reads and order
+# exports there and keeps everything else on the primary.
+DATABASE_READ_REPLICAS = []
+for number, host in enumerate(os.environ.get("DATABASE_REPLICA_HOSTS", "").split(",")):
+    if host.strip():
+        alias = f"replica{number + 1}"
+        DATABASES[alias] = {
+            **DATABASES["default"],
+            "HOST": host.strip(),
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["store.routers.ReplicaRouter"]
+
+# After a write, a client's reads stay on the primary for this many seconds.
+STORE_REPLICA_PIN_SECONDS = 5
+# How long an unreachable replica is skipped before it is tried again.
+STORE_REPLICA_RETRY_SECONDS = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalogue": {
+        "BACKEND": os.environ.get(
+            "CATALOGUE_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CATALOGUE_CACHE_LOCATION", "catalogue"),
+    },
+}
+
+CATALOGUE_CACHE_ALIAS = "catalogue"
+CATALOGUE_CACHE_TIMEOUT = int(os.environ.get("CATALOGUE_CACHE_TIMEOUT", 300))
+
+# Serve product, collection, cart and order reads from values() rows instead
+# of ModelSerializer instances (see store/fast.py).
+STORE_FAST_READS = os.environ.get("STORE_FAST_READS", "") == "1"
+
+# Product payloads embed only the newest STORE_EMBEDDED_REVIEWS reviews plus a
+# "reviews_url" to the paginated list; None embeds every review, as before.
+STORE_EMBEDDED_REVIEWS = 3
+
+# Fraction of requests timed by store.middleware.RequestMetricsMiddleware;
+# 0 disables it. Histograms cover the last SLOTS x SECONDS.
+STORE_METRICS_SAMPLE_RATE = float(os.environ.get("STORE_METRICS_SAMPLE_RATE", 1))
+STORE_METRICS_WINDOW_SLOTS = 5
+STORE_METRICS_WINDOW_SECONDS = 60
+
+# Resized variants generated for every product image (see store/thumbnails.py)
+# on a pool of STORE_IMAGE_WORKERS threads. EAGER runs them at commit in the
+# saving process instead, for tests and one-off scripts.
+STORE_IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+STORE_IMAGE_VARIANT_FORMATS = ("webp", "jpeg")
+STORE_IMAGE_WORKERS = int(os.environ.get("STORE_IMAGE_WORKERS", 2))
+STORE_IMAGE_VARIANTS_EAGER = False
+
+# How long stock added to a cart stays reserved for it (see store/inventory.py).
+STORE_RESERVATION_TTL_SECONDS = 15 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -143,6 +230,14 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "KEYSET_PAGINATION": {
+        "default": {"ordering": ("id",), "page_size": 20, "max_page_size": 100},
+        "products": {"ordering": ("title", "id"), "page_size": 24},
+        "collection_products": {"ordering": ("title", "id"), "page_size": 24},
+        "orders": {"ordering": ("-placed_at", "-id")},
+        "product_reviews": {"ordering": ("-date_created", "-id")},
+        "order_items": {"ordering": ("id",)},
+    },
 }
 
 SIMPLE_JWT = {
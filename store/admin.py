@@ -1,5 +1,5 @@
-from django.db.models import Count
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils.html import format_html, urlencode
 from django.urls import reverse
 
@@ -14,6 +14,8 @@ from .models import (
     CartItem,
     ProductImage,
 )
+from .inventory import set_inventory
+from .search import search_products
 
 
 @admin.register(Collection)
@@ -35,17 +37,56 @@ class CollectionAdmin(admin.ModelAdmin):
             collection.product_count,
         )
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(product_count=Count("products"))
-
 
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 0
 
 
+class InventoryWidget(forms.MultiWidget):
+    def __init__(self, attrs=None):
+        super().__init__([forms.NumberInput(), forms.HiddenInput()], attrs)
+
+    def decompress(self, value):
+        return list(value) if value else [None, None]
+
+
+class InventoryField(forms.MultiValueField):
+    """
+    The inventory plus, in a hidden input, the inventory_version it was read
+    at, so the change list and change form can both detect a stale edit.
+    """
+
+    widget = InventoryWidget
+
+    def __init__(self, **kwargs):
+        fields = (forms.IntegerField(min_value=1), forms.IntegerField(required=False))
+        super().__init__(fields, require_all_fields=False, **kwargs)
+
+    def compress(self, data_list):
+        return tuple(data_list) if data_list else (None, None)
+
+
+class ProductAdminForm(forms.ModelForm):
+    inventory = InventoryField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initial["inventory"] = (
+            self.instance.inventory,
+            self.instance.inventory_version,
+        )
+
+    def clean_inventory(self):
+        inventory, self.inventory_version = self.cleaned_data["inventory"]
+        if inventory is None:
+            raise forms.ValidationError("This field is required.")
+        return inventory
+
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
+    form = ProductAdminForm
     actions = ["update_incart_quantityincart"]
     list_display = [
         "id",
@@ -59,9 +100,36 @@ class ProductAdmin(admin.ModelAdmin):
         "manufacturer",
     ]
     list_editable = ["price", "title", "inventory"]
-    search_fields = ["title", "price", "last_update"]
+    search_fields = ["title", "description", "manufacturer"]
     inlines = [ProductImageInline]
 
+    def get_changelist_form(self, request, **kwargs):
+        return super().get_changelist_form(request, form=ProductAdminForm, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Checkouts change inventory all the time: never write back the value
+        # this form was loaded with, only one the user entered, and only if
+        # nothing changed it in the meantime.
+        fields = [name for name in form.changed_data if name != "inventory"]
+        if fields:
+            obj.save(update_fields=[*fields, "last_update"])
+        if "inventory" in form.changed_data and not set_inventory(
+            obj.pk, obj.inventory, form.inventory_version
+        ):
+            self.message_user(
+                request,
+                f"The inventory of {obj} changed while you were editing it and "
+                "was not saved. Reload the page and try again.",
+                messages.ERROR,
+            )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return search_products(queryset, search_term), False
+
     @admin.action(description="update_incart_quantityincart")
     def update_incart_quantityincart(self, request, queryset):
         count = queryset.update(in_cart=False, quantity_incart=0)
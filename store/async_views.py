@@ -0,0 +1,158 @@
+"""
+Async-native product list/detail and cart read/add endpoints under
+/store/async/.
+
+They return the same payloads as the fast read path of the regular viewsets
+but query through the async ORM, so under ASGI a request waiting on the
+database or a slow client does not hold a worker thread. Adding to a cart
+needs a transaction, which the async ORM cannot open, so only that write
+hops to a thread.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+
+from store.carts import add_cart_item
+from store.fast import CartReader, FastJSONRenderer, ProductReader
+from store.filters import ProductFilter, product_ordering
+from store.inventory import CONFLICT_MESSAGE, InsufficientStock, StaleInventory
+from store.models import Cart, Product
+from store.pagination import KeysetPagination
+from store.routers import allow_replica_reads
+from store.search import SEARCH_PARAM, ProductSearchFilter
+from store.serializers import AsyncAddCartItemSerializer
+
+
+async def aget_row_or_404(queryset, **kwargs):
+    # Like rest_framework.generics.get_object_or_404: malformed keys are a 404.
+    try:
+        return await aget_object_or_404(queryset, **kwargs)
+    except (TypeError, ValueError, DjangoValidationError):
+        raise Http404
+
+
+class AsyncView(View):
+    """
+    Base for the async endpoints: renders with FastJSONRenderer and turns
+    REST framework exceptions into the same error bodies the API returns.
+    """
+
+    renderer = FastJSONRenderer()
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # As with REST framework views, carts are anonymous and no session
+        # authentication is read, so there is no CSRF token to check.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def api_request(self, request):
+        return Request(request, parsers=[parser() for parser in self.parser_classes])
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(
+            self.renderer.render(data),
+            status=status_code,
+            content_type="application/json",
+        )
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return self.handle_exception(NotFound(*exc.args))
+        except APIException as exc:
+            return self.handle_exception(exc)
+
+    def handle_exception(self, exc):
+        detail = exc.detail
+        if not isinstance(detail, (list, dict)):
+            detail = {"detail": detail}
+        return self.render(detail, exc.status_code)
+
+
+class ProductListView(AsyncView):
+    basename = "products"
+    filter_backends = [ProductFilter, ProductSearchFilter]
+
+    def get_keyset_ordering(self, ordering):
+        if self.request.GET.get(SEARCH_PARAM):
+            return ("-search_rank", "id")
+        return product_ordering(self.request.GET, ordering)
+
+    async def get(self, request):
+        allow_replica_reads()
+        api_request = self.api_request(request)
+        queryset = Product.objects.order_by("title")
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(api_request, queryset, self)
+
+        reader = ProductReader(request)
+        paginator = KeysetPagination()
+        columns = list(reader.columns)
+        columns += [
+            name for name in paginator.ordering_fields(self) if name not in columns
+        ]
+        page = await paginator.apaginate_queryset(
+            queryset.values(*columns), api_request, self
+        )
+        results = await reader.arepresent(page)
+        return self.render(paginator.get_paginated_response(results).data)
+
+
+class ProductDetailView(AsyncView):
+    async def get(self, request, pk):
+        allow_replica_reads()
+        reader = ProductReader(request)
+        row = await aget_row_or_404(Product.objects.values(*reader.columns), pk=pk)
+        return self.render((await reader.arepresent([row]))[0])
+
+
+class CartDetailView(AsyncView):
+    async def get(self, request, pk):
+        reader = CartReader(request)
+        row = await aget_row_or_404(Cart.objects.values(*reader.columns), pk=pk)
+        return self.render((await reader.arepresent([row]))[0])
+
+
+class CartItemCreateView(AsyncView):
+    async def post(self, request, cart_pk):
+        serializer = AsyncAddCartItemSerializer(data=self.api_request(request).data)
+        serializer.is_valid(raise_exception=True)
+        product_id = serializer.validated_data["product_id"]
+        quantity = serializer.validated_data["quantity"]
+
+        price = await (
+            Product.objects.filter(pk=product_id)
+            .values_list("price", flat=True)
+            .afirst()
+        )
+        if price is None:
+            raise ValidationError(
+                {"product_id": ["No product with the given ID was found."]}
+            )
+
+        try:
+            item = await sync_to_async(add_cart_item)(
+                cart_pk, product_id, quantity, price
+            )
+        except DjangoValidationError:
+            item = None
+        except InsufficientStock as error:
+            raise ValidationError({"quantity": [str(error)]})
+        except StaleInventory:
+            raise ValidationError({"quantity": [CONFLICT_MESSAGE]})
+        if item is None:
+            raise NotFound("No cart with the given ID was found.")
+
+        return self.render(
+            {"id": item.id, "quantity": item.quantity, "product_id": item.product_id},
+            status.HTTP_201_CREATED,
+        )
@@ -0,0 +1,83 @@
+"""
+The MySQL backend with an optional connection pool, configured the way the
+PostgreSQL backend configures its own:
+
+    "OPTIONS": {"pool": {"max_size": 10, "timeout": 10}}
+
+Without OPTIONS["pool"] this is Django's MySQL backend unchanged.
+"""
+import threading
+
+from django.db.backends.mysql import base as mysql
+
+from store.pool import ConnectionPool
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+    _connection_pools = {}
+    _pools_lock = threading.Lock()
+
+    # Whether the current connection came out of the pool rather than
+    # being opened; read by the connection_created metrics receiver.
+    reused_connection = False
+
+    @property
+    def pool(self):
+        pool_options = self.settings_dict["OPTIONS"].get("pool")
+        if not pool_options:
+            return None
+        with self._pools_lock:
+            if self.alias not in self._connection_pools:
+                if pool_options is True:
+                    pool_options = {}
+                check = (
+                    (lambda connection: connection.ping())
+                    if self.settings_dict["CONN_HEALTH_CHECKS"]
+                    else None
+                )
+                self._connection_pools[self.alias] = ConnectionPool(
+                    check=check, **pool_options
+                )
+            return self._connection_pools[self.alias]
+
+    def close_pool(self):
+        with self._pools_lock:
+            pool = self._connection_pools.pop(self.alias, None)
+        if pool:
+            pool.close()
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if not pool:
+            self.reused_connection = False
+            return super().get_new_connection(conn_params)
+        connection, self.reused_connection = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if self.connection is None or not pool:
+            return super()._close()
+        connection, self.connection = self.connection, None
+        try:
+            # Never hand out a connection with a transaction still open.
+            connection.rollback()
+            if self.errors_occurred:
+                connection.ping()
+        except mysql.Database.Error:
+            pool.discard(connection)
+        else:
+            pool.release(connection)
+
+    def close_if_health_check_failed(self):
+        if self.pool:
+            # The pool checks connections before handing them out.
+            return
+        return super().close_if_health_check_failed()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+VERSION_KEY = "catalogue:version"
+
+
+def get_catalogue_cache():
+    return caches[settings.CATALOGUE_CACHE_ALIAS]
+
+
+def get_catalogue_version():
+    cache = get_catalogue_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    cache = get_catalogue_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
+
+
+def invalidate_catalogue(**kwargs):
+    # Bump now so no reader caches the old payload under the current version,
+    # and again on commit so nothing cached mid-transaction survives it.
+    bump_catalogue_version()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump_catalogue_version)
+
+
+def catalogue_cache_key(request):
+    # Sort the query so the same filter combination shares one entry.
+    query = sorted(request.query_params.lists())
+    path = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return f"catalogue:{get_catalogue_version()}:{path}"
+
+
+def compute_etag(data):
+    payload = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(payload.encode()).hexdigest()
+
+
+class CatalogueCacheMixin:
+    """
+    Serves anonymous list/detail reads from the catalogue cache and answers
+    If-None-Match with 304 Not Modified. Entries are keyed by a catalogue
+    version that the store signals bump whenever catalogue rows change.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_catalogue_cache()
+        key = catalogue_cache_key(request) if request.user.is_anonymous else None
+        entry = cache.get(key) if key else None
+        response = None
+
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = {"etag": compute_etag(response.data), "data": response.data}
+            if key:
+                cache.set(key, entry, settings.CATALOGUE_CACHE_TIMEOUT)
+
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in etags or entry["etag"] in etags:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry["etag"]}
+            )
+
+        if response is None:
+            response = Response(entry["data"])
+        response["ETag"] = entry["etag"]
+        return response
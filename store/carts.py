@@ -0,0 +1,63 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from store.inventory import reserve, retry_on_conflict
+from store.models import Cart, CartItem
+
+
+def apply_cart_delta(cart_id, quantity, unit_price):
+    return Cart.objects.filter(pk=cart_id).update(
+        total_price=F("total_price") + quantity * unit_price,
+        item_count=F("item_count") + quantity,
+    )
+
+
+def add_cart_item(cart_id, product_id, quantity, unit_price):
+    """
+    Add `quantity` of a product to a cart, reserving the stock, and return
+    the cart item, or None when the cart does not exist. Raises
+    InsufficientStock when the stock is not available.
+    """
+    return retry_on_conflict(
+        store_cart_item, cart_id, product_id, quantity, unit_price
+    )
+
+
+def store_cart_item(cart_id, product_id, quantity, unit_price):
+    cart_items = CartItem.objects.filter(cart_id=cart_id, product_id=product_id)
+
+    # Increment in SQL so concurrent adds cannot overwrite each other;
+    # insert only when no row exists, and if another request inserted
+    # it first, fall back to the increment again.
+    if not cart_items.update(quantity=F("quantity") + quantity):
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(
+                    cart_id=cart_id, product_id=product_id, quantity=quantity
+                )
+        except IntegrityError:
+            if not cart_items.update(quantity=F("quantity") + quantity):
+                return None
+
+    reserve(cart_id, product_id, quantity)
+    apply_cart_delta(cart_id, quantity, unit_price)
+    return cart_items.get()
+
+
+def recalculate_cart_totals(carts=None):
+    if carts is None:
+        carts = Cart.objects.all()
+    totals = (
+        CartItem.objects.filter(cart=OuterRef("pk"))
+        .order_by()
+        .values("cart")
+        .annotate(
+            total_price=Sum(F("quantity") * F("product__price")),
+            item_count=Sum("quantity"),
+        )
+    )
+    return carts.update(
+        total_price=Coalesce(Subquery(totals.values("total_price")), Value(0)),
+        item_count=Coalesce(Subquery(totals.values("item_count")), Value(0)),
+    )
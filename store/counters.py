@@ -0,0 +1,76 @@
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
+
+from store.models import Collection, Product, ProductReview
+
+
+def adjust_product_count(collection_id, delta):
+    return Collection.objects.filter(pk=collection_id).update(
+        product_count=F("product_count") + delta
+    )
+
+
+def recount_collection_products(collections=None):
+    if collections is None:
+        collections = Collection.objects.all()
+    counts = (
+        Product.objects.filter(collection=OuterRef("pk"))
+        .order_by()
+        .values("collection")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return collections.update(product_count=Coalesce(Subquery(counts), Value(0)))
+
+
+def adjust_review_stats(product_id, reviews=0, added_rating=None, removed_rating=None):
+    """
+    Apply one review change to a product's aggregates: `reviews` reviews
+    added (or removed, when negative), and a rating that was added and/or
+    removed.
+    """
+    rated = (added_rating is not None) - (removed_rating is not None)
+    total = (added_rating or 0) - (removed_rating or 0)
+    return Product.objects.filter(pk=product_id).update(
+        # Listed first: MySQL applies SET assignments left to right, so this
+        # must read rating_count and rating_total before they change.
+        average_rating=Case(
+            When(rating_count=-rated, then=Value(0.0)),
+            default=Cast(F("rating_total") + total, FloatField())
+            / (F("rating_count") + rated),
+        ),
+        review_count=F("review_count") + reviews,
+        rating_count=F("rating_count") + rated,
+        rating_total=F("rating_total") + total,
+    )
+
+
+def recount_product_reviews(products=None):
+    if products is None:
+        products = Product.objects.all()
+    reviews = (
+        ProductReview.objects.filter(product=OuterRef("pk")).order_by().values("product")
+    )
+
+    def aggregate(function, default=0):
+        return Coalesce(
+            Subquery(reviews.annotate(value=function).values("value")), Value(default)
+        )
+
+    return products.update(
+        review_count=aggregate(Count("pk")),
+        rating_count=aggregate(Count("rating")),
+        rating_total=aggregate(Sum("rating")),
+        average_rating=aggregate(Cast(Avg("rating"), FloatField()), 0.0),
+    )
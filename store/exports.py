@@ -0,0 +1,131 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from store.models import Order, OrderItem
+from store.pagination import seek_filter
+from store.routers import reporting_database
+
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_COLUMNS = {
+    "id": "id",
+    "placed_at": "placed_at",
+    "payment_status": "payment_status",
+    "customer_id": "customer_id",
+    "customer_email": "customer__user__email",
+    "customer_first_name": "customer__user__first_name",
+    "customer_last_name": "customer__user__last_name",
+    "customer_phone": "customer__phone",
+}
+
+ORDER_ITEM_COLUMNS = {
+    "id": "id",
+    "order_id": "order_id",
+    "placed_at": "order__placed_at",
+    "payment_status": "order__payment_status",
+    "customer_id": "order__customer_id",
+    "product_id": "product_id",
+    "product_title": "product__title",
+    "quantity": "quantity",
+    "unit_price": "unit_price",
+}
+
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def filter_orders(queryset, params, prefix=""):
+    for param, lookup in [("placed_after", "gte"), ("placed_before", "lt")]:
+        if param in params:
+            placed_at = parse_datetime(params[param])
+            if placed_at is None:
+                raise ValidationError({param: "Enter a valid ISO 8601 date/time."})
+            queryset = queryset.filter(**{f"{prefix}placed_at__{lookup}": placed_at})
+
+    if "payment_status" in params:
+        statuses = dict(Order.PAYMENT_STATUS_CHOICES)
+        if params["payment_status"] not in statuses:
+            raise ValidationError(
+                {"payment_status": f"Choose one of {', '.join(statuses)}."}
+            )
+        queryset = queryset.filter(
+            **{f"{prefix}payment_status": params["payment_status"]}
+        )
+    return queryset
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+def keyset_rows(queryset, ordering, fields):
+    """
+    Yield values_list rows of `fields` in `ordering`, EXPORT_CHUNK_SIZE at a
+    time. Each chunk is its own LIMIT query that seeks past the last row of
+    the one before, so no driver ever holds more than a chunk in memory
+    (mysqlclient buffers a whole result set, even under iterator()).
+    """
+    keys = [field.lstrip("-") for field in ordering]
+    queryset = queryset.order_by(*ordering).values_list(*fields, *keys)
+    chunk = queryset
+    while True:
+        rows = list(chunk[:EXPORT_CHUNK_SIZE])
+        for row in rows:
+            yield row[: len(fields)]
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            return
+        chunk = queryset.filter(seek_filter(ordering, rows[-1][len(fields) :]))
+
+
+def stream_export(queryset, ordering, columns, output, filename):
+    if output not in CONTENT_TYPES:
+        raise ValidationError({"output": f"Choose one of {', '.join(CONTENT_TYPES)}."})
+
+    rows = keyset_rows(
+        queryset.using(reporting_database()), ordering, list(columns.values())
+    )
+    lines = csv_lines if output == "csv" else ndjson_lines
+    response = StreamingHttpResponse(
+        lines(list(columns), rows), content_type=CONTENT_TYPES[output]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+def export_orders(params):
+    queryset = filter_orders(Order.objects.all(), params)
+    return stream_export(
+        queryset,
+        ("placed_at", "id"),
+        ORDER_COLUMNS,
+        params.get("output", "csv"),
+        "orders",
+    )
+
+
+def export_order_items(params):
+    queryset = filter_orders(OrderItem.objects.all(), params, prefix="order__")
+    return stream_export(
+        queryset,
+        ("order__placed_at", "order_id", "id"),
+        ORDER_ITEM_COLUMNS,
+        params.get("output", "csv"),
+        "order_items",
+    )
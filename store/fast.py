@@ -0,0 +1,367 @@
+"""
+Fast read path for hot list/detail endpoints.
+
+Readers build the same payload as the matching ModelSerializer straight from
+values() rows, with one batched query per nested relation and a mapper per
+field compiled once. Enabled with the STORE_FAST_READS setting; requests that
+use sparse fieldsets still go through the regular serializers.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from store.filters import REVIEW_ORDERING
+from store.metrics import timed_serialization
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Order,
+    Product,
+    ProductImage,
+    ProductReview,
+)
+from store.thumbnails import srcsets, variant_urls
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that uses orjson when it is installed. The output matches
+    the compact, UTF-8 output of the default renderer for the plain types the
+    fast readers produce.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+def datetime_mapper():
+    return serializers.DateTimeField().to_representation
+
+
+def nullable(mapper):
+    return lambda value: None if value is None else mapper(value)
+
+
+class Many:
+    """
+    Children of each row, in `ordering` within a row. With a `limit`, only the
+    first `limit` per row are read, for the whole page in one window query.
+    """
+
+    def __init__(self, reader, foreign_key, ordering=("id",), limit=None):
+        self.reader = reader
+        self.foreign_key = foreign_key
+        self.ordering = ordering
+        self.limit = limit
+
+
+class FastReader:
+    """
+    `columns` are passed to values(); `fields` lists (output key, source) in
+    serializer order, where a source is a column name, a (column, mapper)
+    pair, a callable taking the row, or Many(reader, foreign_key, ...).
+    """
+
+    model = None
+    columns = []
+    fields = []
+
+    def __init__(self, request=None):
+        self.request = request
+        self.compiled = [(key, self.compile(source)) for key, source in self.fields]
+
+    def compile(self, source):
+        if isinstance(source, str):
+            return itemgetter(source)
+        if isinstance(source, tuple):
+            column, mapper = source
+            mapper = nullable(mapper)
+            return lambda row: mapper(row[column])
+        return source
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    def nested_querysets(self, rows):
+        ids = [row["id"] for row in rows]
+        for key, source in self.fields:
+            if not isinstance(source, Many) or not ids:
+                continue
+            reader = source.reader(self.request)
+            queryset = reader.queryset().filter(
+                **{f"{source.foreign_key}__in": ids}
+            )
+            if source.limit is not None:
+                queryset = queryset.annotate(
+                    position=Window(
+                        RowNumber(),
+                        partition_by=F(source.foreign_key),
+                        order_by=source.ordering,
+                    )
+                ).filter(position__lte=source.limit)
+            queryset = queryset.order_by(source.foreign_key, *source.ordering).values(
+                source.foreign_key, *reader.columns
+            )
+            yield key, source.foreign_key, reader, queryset
+
+    def group(self, foreign_key, children, represented):
+        grouped = defaultdict(list)
+        for child, data in zip(children, represented):
+            grouped[child[foreign_key]].append(data)
+        return grouped
+
+    def fetch_nested(self, rows):
+        nested = {}
+        for key, foreign_key, reader, queryset in self.nested_querysets(rows):
+            children = list(queryset)
+            nested[key] = self.group(foreign_key, children, reader.represent(children))
+        return nested
+
+    async def afetch_nested(self, rows):
+        nested = {}
+        for key, foreign_key, reader, queryset in self.nested_querysets(rows):
+            children = [child async for child in queryset.aiterator()]
+            represented = await reader.arepresent(children)
+            nested[key] = self.group(foreign_key, children, represented)
+        return nested
+
+    @timed_serialization
+    def represent(self, rows):
+        return self.build(rows, self.fetch_nested(rows))
+
+    @timed_serialization
+    async def arepresent(self, rows):
+        return self.build(rows, await self.afetch_nested(rows))
+
+    def build(self, rows, nested):
+        results = []
+        for row in rows:
+            data = {}
+            for key, getter in self.compiled:
+                if isinstance(getter, Many):
+                    data[key] = nested.get(key, {}).get(row["id"], [])
+                else:
+                    data[key] = getter(row)
+            results.append(data)
+        return results
+
+
+class ProductImageReader(FastReader):
+    model = ProductImage
+    columns = ["id", "image", "variants"]
+
+    def __init__(self, request=None):
+        storage = ProductImage._meta.get_field("image").storage
+
+        def image_url(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+
+        def variants(row):
+            return variant_urls(row["variants"], image_url)
+
+        self.fields = [
+            ("id", "id"),
+            ("image", lambda row: image_url(row["image"])),
+            ("variants", variants),
+            ("srcset", lambda row: srcsets(variants(row))),
+        ]
+        super().__init__(request)
+
+
+class ProductReviewReader(FastReader):
+    model = ProductReview
+    columns = ["id", "customer_name", "description", "rating", "date_created"]
+    fields = [
+        ("id", "id"),
+        ("customer_name", "customer_name"),
+        ("description", "description"),
+        ("rating", "rating"),
+        ("date_created", ("date_created", datetime_mapper())),
+    ]
+
+
+class ProductReader(FastReader):
+    model = Product
+    columns = [
+        "id",
+        "title",
+        "description",
+        "price",
+        "inventory",
+        "collection_id",
+        "in_cart",
+        "manufacturer",
+        "review_count",
+        "average_rating",
+    ]
+
+    def __init__(self, request=None):
+        def reviews_url(product_id):
+            url = reverse("product_reviews-list", kwargs={"product_pk": product_id})
+            return request.build_absolute_uri(url) if request else url
+
+        limit = getattr(settings, "STORE_EMBEDDED_REVIEWS", None)
+        if limit is None:
+            reviews = [("reviews", Many(ProductReviewReader, "product_id"))]
+        else:
+            reviews = [
+                (
+                    "reviews",
+                    Many(
+                        ProductReviewReader,
+                        "product_id",
+                        ordering=REVIEW_ORDERING,
+                        limit=limit,
+                    ),
+                ),
+                ("reviews_url", lambda row: reviews_url(row["id"])),
+            ]
+
+        self.fields = [
+            ("id", "id"),
+            ("title", "title"),
+            ("description", "description"),
+            ("price", "price"),
+            ("inventory", "inventory"),
+            ("collection", "collection_id"),
+            ("in_cart", "in_cart"),
+            ("images", Many(ProductImageReader, "product_id")),
+            *reviews,
+            ("manufacturer", "manufacturer"),
+            ("review_count", "review_count"),
+            ("average_rating", "average_rating"),
+        ]
+        super().__init__(request)
+
+
+class CollectionReader(FastReader):
+    model = Collection
+    columns = ["id", "title", "product_count", "image_url"]
+    fields = [(column, column) for column in columns]
+
+
+class OrderReader(FastReader):
+    model = Order
+    columns = ["id", "placed_at", "payment_status", "customer_id"]
+    fields = [
+        ("id", "id"),
+        ("placed_at", ("placed_at", datetime_mapper())),
+        ("payment_status", "payment_status"),
+        ("customer", "customer_id"),
+    ]
+
+
+class CartItemReader(FastReader):
+    model = CartItem
+    columns = ["id", "quantity", "product_id", "product__title", "product__price"]
+    fields = [
+        ("id", "id"),
+        ("quantity", "quantity"),
+        (
+            "product",
+            lambda row: {
+                "id": row["product_id"],
+                "title": row["product__title"],
+                "price": row["product__price"],
+            },
+        ),
+        ("total_price", lambda row: row["quantity"] * row["product__price"]),
+    ]
+
+
+class CartReader(FastReader):
+    model = Cart
+    columns = ["id", "item_count", "total_price"]
+    fields = [
+        ("id", ("id", str)),
+        ("items", Many(CartItemReader, "cart_id")),
+        ("item_count", "item_count"),
+        ("cart_total_price", "total_price"),
+    ]
+
+
+class FastRetrieveMixin:
+    """
+    Viewset mixin that answers retrieve with `fast_reader` when
+    STORE_FAST_READS is on and the request does not ask for sparse fields.
+    """
+
+    fast_reader = None
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def use_fast_read(self):
+        params = self.request.query_params
+        return (
+            getattr(settings, "STORE_FAST_READS", False)
+            and self.fast_reader is not None
+            and "fields" not in params
+            and "expand" not in params
+        )
+
+    def fast_queryset(self, reader):
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = list(reader.columns)
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, "ordering_fields"):
+            columns += [
+                name for name in paginator.ordering_fields(self) if name not in columns
+            ]
+        return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().retrieve(request, *args, **kwargs)
+
+        reader = self.fast_reader(request)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.fast_queryset(reader),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]},
+        )
+        self.check_object_permissions(request, row)
+        return Response(reader.represent([row])[0])
+
+
+class FastReadMixin(FastRetrieveMixin):
+    """
+    FastRetrieveMixin that also serves list, paginated as usual.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_read():
+            return super().list(request, *args, **kwargs)
+
+        reader = self.fast_reader(request)
+        queryset = self.fast_queryset(reader)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+        return Response(reader.represent(list(queryset)))
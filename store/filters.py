@@ -0,0 +1,121 @@
+from collections import defaultdict
+
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+PRICE_BUCKETS = [(0, 50), (50, 100), (100, 250), (250, 500), (500, 1000), (1000, None)]
+
+TRUE_VALUES = {"1", "true", "yes"}
+
+ORDERING_PARAM = "ordering"
+# ?ordering= values for product lists and the keyset ordering each maps to.
+# Every one of them is served by an index on Product.
+PRODUCT_ORDERINGS = {
+    "title": ("title", "id"),
+    "-average_rating": ("-average_rating", "-review_count", "-id"),
+    "-review_count": ("-review_count", "-id"),
+}
+# Newest reviews first, as on /store/products/<id>/reviews/. Product payloads
+# embed the first STORE_EMBEDDED_REVIEWS of them in the same order.
+REVIEW_ORDERING = ("-date_created", "-id")
+
+
+def parse_int(params, name):
+    if name not in params:
+        return None
+    try:
+        return int(params[name])
+    except ValueError:
+        raise ValidationError({name: "Enter a whole number."})
+
+
+class ProductFilter(BaseFilterBackend):
+    """
+    Filters products by ?collection_id=, ?manufacturer=, ?min_price=,
+    ?max_price= and ?in_stock=true. Repeat collection_id or manufacturer to
+    match any of several values.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        collection_ids = params.getlist("collection_id")
+        if collection_ids:
+            if not all(value.isdigit() for value in collection_ids):
+                raise ValidationError({"collection_id": "Enter a whole number."})
+            queryset = queryset.filter(collection_id__in=collection_ids)
+
+        manufacturers = params.getlist("manufacturer")
+        if manufacturers:
+            queryset = queryset.filter(manufacturer__in=manufacturers)
+
+        min_price = parse_int(params, "min_price")
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        max_price = parse_int(params, "max_price")
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        if params.get("in_stock", "").lower() in TRUE_VALUES:
+            queryset = queryset.filter(inventory__gt=0)
+
+        return queryset
+
+
+def product_ordering(params, default):
+    value = params.get(ORDERING_PARAM)
+    if not value:
+        return default
+    if value not in PRODUCT_ORDERINGS:
+        raise ValidationError(
+            {ORDERING_PARAM: f"Choose one of {', '.join(PRODUCT_ORDERINGS)}."}
+        )
+    return PRODUCT_ORDERINGS[value]
+
+
+def price_bucket():
+    whens = []
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        condition = Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        whens.append(When(condition, then=Value(index)))
+    return Case(*whens, default=Value(None), output_field=IntegerField())
+
+
+def product_facets(queryset):
+    """
+    Count products per collection, manufacturer and price bucket with a
+    single GROUP BY over all three columns, folded into three facets here.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket())
+        .values("collection_id", "manufacturer", "price_bucket")
+        .annotate(count=Count("id"))
+    )
+
+    collections = defaultdict(int)
+    manufacturers = defaultdict(int)
+    buckets = defaultdict(int)
+    for row in rows:
+        collections[row["collection_id"]] += row["count"]
+        manufacturers[row["manufacturer"]] += row["count"]
+        if row["price_bucket"] is not None:
+            buckets[row["price_bucket"]] += row["count"]
+
+    return {
+        "collections": [
+            {"id": collection_id, "count": count}
+            for collection_id, count in sorted(collections.items())
+        ],
+        "manufacturers": [
+            {"value": manufacturer, "count": count}
+            for manufacturer, count in sorted(manufacturers.items())
+        ],
+        "price_ranges": [
+            {"min": low, "max": high, "count": buckets[index]}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
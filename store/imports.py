@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import F
+
+from store.caching import invalidate_catalogue
+from store.carts import recalculate_cart_totals
+from store.counters import recount_collection_products
+from store.models import Cart, Collection, Product
+from store.search import index_products
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_FIELDS = ["title", "description", "price", "inventory", "manufacturer"]
+INPUT_FORMATS = ["csv", "json", "ndjson"]
+
+
+def guess_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in INPUT_FORMATS else "csv"
+
+
+def read_rows(stream, input_format):
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+    elif input_format == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from json.load(stream)
+
+
+def build_product(row, collection_ids):
+    errors = {}
+    collection_id = collection_ids.get(row.get("collection"))
+    if collection_id is None:
+        errors["collection"] = [f"Unknown collection {row.get('collection')!r}."]
+
+    values = {
+        field: row[field]
+        for field in IMPORT_FIELDS
+        if row.get(field) not in (None, "")
+    }
+    product = Product(collection_id=collection_id, **values)
+    if row.get("id") not in (None, ""):
+        product.pk = row["id"]
+    try:
+        product.clean_fields(exclude=["collection", "last_update"])
+    except ValidationError as error:
+        errors.update(error.message_dict)
+    return product, list(values), errors
+
+
+def import_products(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Validate and upsert product rows in batches. Rows that fail validation are
+    reported and skipped; the rest of their batch is still written. Rows with
+    an "id" update that product (or create it with that id), others insert.
+    """
+    collection_ids = dict(Collection.objects.values_list("title", "id"))
+    result = {"created": 0, "updated": 0, "errors": []}
+    rows = enumerate(rows, start=1)
+
+    while batch := list(islice(rows, batch_size)):
+        products = []
+        for number, row in batch:
+            product, fields, errors = build_product(row, collection_ids)
+            if errors:
+                result["errors"].append({"row": number, "errors": errors})
+            else:
+                products.append((product, fields))
+        if products:
+            created, updated = upsert_products(products)
+            result["created"] += created
+            result["updated"] += updated
+
+    invalidate_catalogue()
+    return result
+
+
+def upsert_products(products):
+    """
+    Upsert (product, fields) pairs, where `fields` are the IMPORT_FIELDS the
+    row gave. An update only overwrites those, so a column left out of the
+    file keeps its current value instead of going back to the model default.
+    """
+    ids = [product.pk for product, _ in products if product.pk is not None]
+    existing = set(Product.objects.filter(pk__in=ids).values_list("pk", flat=True))
+    collection_ids = {product.collection_id for product, _ in products}
+    collection_ids |= set(
+        Product.objects.filter(pk__in=existing).values_list("collection_id", flat=True)
+    )
+    groups = defaultdict(list)
+    for product, fields in products:
+        groups[tuple(fields)].append(product)
+
+    # MySQL upserts on any unique key and rejects an explicit conflict target.
+    unique_fields = (
+        ["id"] if connection.features.supports_update_conflicts_with_target else None
+    )
+    with transaction.atomic():
+        for fields, group in groups.items():
+            Product.objects.bulk_create(
+                group,
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=[*fields, "collection", "last_update"],
+            )
+            if "inventory" in fields:
+                # Tell carts that checked stock before this import to check again.
+                Product.objects.filter(
+                    pk__in=[product.pk for product in group if product.pk in existing]
+                ).update(inventory_version=F("inventory_version") + 1)
+        # bulk_create skips signals, so repair what they would have maintained.
+        recount_collection_products(Collection.objects.filter(pk__in=collection_ids))
+        recalculate_cart_totals(Cart.objects.filter(items__product__in=existing))
+        # Index what was stored: updated rows may keep columns the file left out.
+        index_products(
+            Product.objects.filter(
+                pk__in=[product.pk for product, _ in products if product.pk]
+            )
+        )
+
+    return len(products) - len(existing), len(existing)
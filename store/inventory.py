@@ -0,0 +1,222 @@
+"""
+Inventory reservations.
+
+Adding an item to a cart reserves the stock for STORE_RESERVATION_TTL_SECONDS
+(refreshed on every add). Available stock is inventory minus the unexpired
+reservations, so an expired reservation stops counting without any cleanup.
+Checkout turns the cart's reservations into an inventory decrement.
+
+There are no long-held row locks. A writer reads the product's inventory and
+inventory_version, checks availability, and then writes with an UPDATE that
+only matches the version it read. If another writer got in first, the UPDATE
+matches no rows: the writer raises StaleInventory, the caller's transaction
+rolls back, and retry_on_conflict() starts it again from a fresh read.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from store.caching import invalidate_catalogue
+from store.models import InventoryReservation, Product
+
+CONFLICT_ATTEMPTS = 5
+# Longest wait, in seconds, before the first retry; it doubles on each one.
+CONFLICT_BACKOFF = 0.01
+# Shown when a write still conflicts after CONFLICT_ATTEMPTS tries.
+CONFLICT_MESSAGE = "The stock of these products is changing; try again."
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Not enough inventory for products: {self.product_ids}.")
+
+
+class StaleInventory(Exception):
+    """Another writer changed the product's stock after we read it."""
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, "STORE_RESERVATION_TTL_SECONDS", 900))
+
+
+def unexpired_reservations(exclude_cart_id=None):
+    reservations = InventoryReservation.objects.filter(expires_at__gt=timezone.now())
+    if exclude_cart_id is not None:
+        reservations = reservations.exclude(cart_id=exclude_cart_id)
+    return reservations
+
+
+def active_reservations(product_ids, exclude_cart_id=None):
+    """Return {product_id: units held by unexpired reservations}."""
+    return dict(
+        unexpired_reservations(exclude_cart_id)
+        .filter(product_id__in=product_ids)
+        .order_by()
+        .values("product_id")
+        .annotate(held=Sum("quantity"))
+        .values_list("product_id", "held")
+    )
+
+
+def check_stock(quantities, exclude_cart_id=None):
+    """
+    Check that `quantities` ({product_id: units}) are available and return the
+    {product_id: inventory_version} that was read. Raises InsufficientStock.
+    """
+    held = (
+        unexpired_reservations(exclude_cart_id)
+        .filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(held=Sum("quantity"))
+        .values("held")
+    )
+    # One query reads stock, version and reservations together.
+    stock = {
+        product_id: (inventory - held, version)
+        for product_id, inventory, version, held in Product.objects.filter(
+            pk__in=quantities
+        )
+        .annotate(held=Coalesce(Subquery(held), Value(0)))
+        .values_list("id", "inventory", "inventory_version", "held")
+    }
+    short = [
+        product_id
+        for product_id, quantity in quantities.items()
+        if product_id not in stock or stock[product_id][0] < quantity
+    ]
+    if short:
+        raise InsufficientStock(short)
+    return {product_id: version for product_id, (_, version) in stock.items()}
+
+
+def claim_versions(versions, **updates):
+    """
+    Bump the inventory_version of every product in `versions` (and apply
+    `updates`) in one UPDATE, provided none changed since it was read.
+    """
+    if not versions:
+        # An empty Q() would match, and lock, every product.
+        return
+    matches = Q()
+    for product_id, version in versions.items():
+        matches |= Q(pk=product_id, inventory_version=version)
+    claimed = Product.objects.filter(matches).update(
+        inventory_version=F("inventory_version") + 1, **updates
+    )
+    if claimed != len(versions):
+        raise StaleInventory()
+
+
+def reserve(cart_id, product_id, quantity):
+    """
+    Hold `quantity` more units of a product for a cart. Must run inside a
+    transaction; raises InsufficientStock or StaleInventory.
+
+    An expired reservation no longer holds anything, and other carts may have
+    taken its units, so it starts over from `quantity` rather than coming
+    back to life with its old units on top.
+    """
+    versions = check_stock({product_id: quantity})
+    claim_versions(versions)
+
+    now = timezone.now()
+    expires_at = now + reservation_ttl()
+    reservations = InventoryReservation.objects.filter(
+        cart_id=cart_id, product_id=product_id
+    )
+    if not reservations.update(
+        # Listed first: MySQL applies SET assignments left to right, so this
+        # must read expires_at before it is refreshed.
+        quantity=Case(
+            When(expires_at__lte=now, then=Value(quantity)),
+            default=F("quantity") + quantity,
+        ),
+        expires_at=expires_at,
+    ):
+        try:
+            with transaction.atomic():
+                InventoryReservation.objects.create(
+                    cart_id=cart_id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    expires_at=expires_at,
+                )
+        except IntegrityError:
+            # Same cart, same product, added concurrently: the version check
+            # would normally have caught it, so let the caller retry.
+            raise StaleInventory()
+
+
+def release(cart_id, product_id, quantity=None):
+    """
+    Give back `quantity` reserved units (all of them when None). Releasing
+    only makes more stock available, so it needs no version check.
+    """
+    reservations = InventoryReservation.objects.filter(
+        cart_id=cart_id, product_id=product_id
+    )
+    if quantity is None:
+        return reservations.delete()[0]
+    reservations.update(quantity=F("quantity") - quantity)
+    return reservations.filter(quantity__lte=0).delete()[0]
+
+
+def commit_cart(cart_id, quantities):
+    """
+    Take `quantities` ({product_id: units}) out of inventory for a cart's
+    checkout. The cart's own reservations count as available, other carts'
+    do not. Must run inside a transaction; raises InsufficientStock or
+    StaleInventory.
+    """
+    versions = check_stock(quantities, exclude_cart_id=cart_id)
+    claim_versions(
+        versions,
+        inventory=Case(
+            *[
+                When(pk=product_id, then=F("inventory") - quantity)
+                for product_id, quantity in quantities.items()
+            ],
+            default=F("inventory"),
+        ),
+    )
+    InventoryReservation.objects.filter(cart_id=cart_id).delete()
+
+
+def set_inventory(product_id, inventory, version):
+    """
+    Overwrite a product's inventory unless it changed since `version` was
+    read. Returns whether it was written.
+    """
+    written = Product.objects.filter(pk=product_id, inventory_version=version).update(
+        inventory=inventory, inventory_version=F("inventory_version") + 1
+    )
+    if written:
+        # update() sends no post_save, so the catalogue is not refreshed for us.
+        invalidate_catalogue()
+    return bool(written)
+
+
+def retry_on_conflict(func, *args, **kwargs):
+    """
+    Run `func` in a transaction, starting over on StaleInventory. Each
+    attempt is a new transaction, so it reads the other writer's changes.
+    Attempts are spaced by a random, growing delay: writers that collided
+    once would collide again if they all retried at the same moment.
+    """
+    for attempt in range(CONFLICT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except StaleInventory:
+            if attempt == CONFLICT_ATTEMPTS - 1:
+                raise
+        time.sleep(random.uniform(0, CONFLICT_BACKOFF * 2**attempt))
+
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from store.models import ProductImage
+from store.thumbnails import build_variants, run_job
+
+
+class Command(BaseCommand):
+    help = "Generate the resized variants of product images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "image_ids",
+            nargs="*",
+            type=int,
+            help="Only these product images (default: all).",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Skip images that already have variants.",
+        )
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image="").order_by("id")
+        if options["image_ids"]:
+            images = images.filter(pk__in=options["image_ids"])
+        if options["missing"]:
+            images = images.filter(variants=[])
+        image_ids = list(images.values_list("id", flat=True))
+
+        if options["workers"] > 1:
+            with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+                results = list(executor.map(run_job, image_ids))
+        else:
+            results = [build_variants(image_id) for image_id in image_ids]
+
+        failed = results.count(None)
+        files = sum(result for result in results if result is not None)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {files} variants for {len(results) - failed} images"
+            )
+        )
+        if failed:
+            self.stderr.write(f"{failed} images failed, see the log for details")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from store.imports import (
+    IMPORT_BATCH_SIZE,
+    INPUT_FORMATS,
+    guess_format,
+    import_products,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Validate and upsert products from a CSV, JSON or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=INPUT_FORMATS)
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        input_format = options["format"] or guess_format(options["path"])
+        with open(options["path"], encoding="utf-8", newline="") as stream:
+            result = import_products(
+                read_rows(stream, input_format), batch_size=options["batch_size"]
+            )
+
+        for error in result["errors"]:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result['created']}, updated {result['updated']}, "
+                f"rejected {len(result['errors'])} products"
+            )
+        )
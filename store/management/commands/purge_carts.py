@@ -0,0 +1,102 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from store.models import Cart, InventoryReservation
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete abandoned carts older than --days in small chunks so no single "
+        "statement holds long locks or cascades through a huge collector."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=30)
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.1,
+            help="Seconds to sleep between chunks to leave room for other writers.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep purging forever at low CPU priority.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600,
+            help="Seconds to wait between passes when --loop is given.",
+        )
+
+    def handle(self, *args, **options):
+        if options["loop"] and hasattr(os, "nice"):
+            os.nice(10)
+
+        while True:
+            self.purge(options)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+    def purge(self, options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        stale = Cart.objects.filter(created_at__lt=cutoff)
+
+        if options["dry_run"]:
+            count = stale.count()
+            expired = InventoryReservation.objects.filter(
+                expires_at__lte=timezone.now()
+            ).count()
+            self.stdout.write(
+                f"Would delete {count} carts created before {cutoff} "
+                f"and {expired} expired reservations"
+            )
+            return count
+
+        started = time.monotonic()
+        deleted = self.delete_in_chunks(stale, "created_at", options)
+        # Deleting a cart releases its reservations along with it; expired
+        # ones in live carts no longer hold stock and are only cleared away,
+        # in the same small chunks.
+        expired = self.delete_in_chunks(
+            InventoryReservation.objects.filter(expires_at__lte=timezone.now()),
+            "expires_at",
+            options,
+        )
+
+        elapsed = time.monotonic() - started
+        rate = deleted / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} carts in {elapsed:.2f}s ({rate:.0f} carts/s) "
+                f"and {expired} expired reservations"
+            )
+        )
+        return deleted
+
+    def delete_in_chunks(self, queryset, order_field, options):
+        deleted = 0
+        while True:
+            chunk = list(
+                queryset.order_by(order_field).values_list("pk", flat=True)[
+                    : options["chunk_size"]
+                ]
+            )
+            if not chunk:
+                break
+            with transaction.atomic():
+                queryset.model.objects.filter(pk__in=chunk).delete()
+            deleted += len(chunk)
+            if len(chunk) < options["chunk_size"]:
+                break
+            time.sleep(options["pause"])
+        return deleted
@@ -0,0 +1,35 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from store.models import Product
+from store.search import index_products, uses_fulltext
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the product search token index. Each batch replaces its own "
+        "products' tokens in one transaction, so search keeps working meanwhile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if uses_fulltext():
+            self.stdout.write("MySQL maintains the FULLTEXT index; nothing to do")
+            return
+
+        products = Product.objects.only(
+            "id", "title", "description", "manufacturer"
+        ).iterator(chunk_size=options["batch_size"])
+        indexed = tokens = 0
+        while batch := list(islice(products, options["batch_size"])):
+            with transaction.atomic():
+                tokens += index_products(batch)
+            indexed += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {indexed} products ({tokens} tokens)")
+        )
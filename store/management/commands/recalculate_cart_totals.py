@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.carts import recalculate_cart_totals
+from store.models import Cart
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized total_price and item_count of carts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "cart_ids", nargs="*", help="Only repair these carts (default: all)."
+        )
+
+    def handle(self, *args, **options):
+        carts = Cart.objects.all()
+        if options["cart_ids"]:
+            carts = carts.filter(pk__in=options["cart_ids"])
+        count = recalculate_cart_totals(carts)
+        self.stdout.write(self.style.SUCCESS(f"Recalculated totals for {count} carts"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store.caching import invalidate_catalogue
+from store.counters import recount_collection_products
+from store.models import Collection
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized product_count of collections."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "collection_ids",
+            nargs="*",
+            type=int,
+            help="Only repair these collections (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        collections = Collection.objects.all()
+        if options["collection_ids"]:
+            collections = collections.filter(pk__in=options["collection_ids"])
+        count = recount_collection_products(collections)
+        invalidate_catalogue()
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted products for {count} collections")
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store.caching import invalidate_catalogue
+from store.counters import recount_product_reviews
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized review count and rating of products."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "product_ids",
+            nargs="*",
+            type=int,
+            help="Only repair these products (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options["product_ids"]:
+            products = products.filter(pk__in=options["product_ids"])
+        count = recount_product_reviews(products)
+        invalidate_catalogue()
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted reviews for {count} products")
+        )
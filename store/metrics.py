@@ -0,0 +1,193 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from rest_framework.serializers import BaseSerializer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    "store_request_duration_seconds": ("Total request latency.", LATENCY_BUCKETS),
+    "store_db_duration_seconds": ("Time spent in SQL per request.", LATENCY_BUCKETS),
+    "store_serialize_duration_seconds": (
+        "Time spent building response data in serializers and fast readers.",
+        LATENCY_BUCKETS,
+    ),
+    "store_render_duration_seconds": (
+        "Time spent encoding the response body.",
+        LATENCY_BUCKETS,
+    ),
+    "store_db_queries": ("SQL queries issued per request.", QUERY_BUCKETS),
+}
+
+COUNTERS = {
+    "store_db_connections_opened_total": "Database connections opened.",
+    "store_db_connections_reused_total": "Pooled database connections reused.",
+}
+
+
+# The SerializationTimer of the request being measured; only sampled requests
+# set one, so unsampled ones pay for a single ContextVar lookup.
+serialization_timer = ContextVar("store_serialization_timer", default=None)
+
+
+class SerializationTimer:
+    def __init__(self):
+        self.duration = 0
+        self.depth = 0
+
+    @contextmanager
+    def measure(self):
+        # A serializer or reader nested in another is only counted once.
+        self.depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.duration += time.perf_counter() - started
+
+
+def timed_serialization(func):
+    """Count the time spent in `func` as serialization of the current request."""
+    if iscoroutinefunction(func):
+
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            timer = serialization_timer.get()
+            if timer is None:
+                return await func(*args, **kwargs)
+            with timer.measure():
+                return await func(*args, **kwargs)
+
+    else:
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            timer = serialization_timer.get()
+            if timer is None:
+                return func(*args, **kwargs)
+            with timer.measure():
+                return func(*args, **kwargs)
+
+    timed.serialization_timed = True
+    return timed
+
+
+def instrument_serializers():
+    """
+    Time every DRF serializer's .data, where to_representation() runs for the
+    whole (nested) payload. Safe to call more than once.
+    """
+    data = BaseSerializer.data
+    if not getattr(data.fget, "serialization_timed", False):
+        BaseSerializer.data = property(timed_serialization(data.fget))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, other):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.sum += other.sum
+
+
+class MetricsRegistry:
+    """
+    Per-process histograms keyed by (metric, view name). Observations land in
+    the slot for the current interval; only the last `slots` intervals are
+    reported, so the histograms describe a rolling window.
+    """
+
+    def __init__(self, slots=None, interval=None):
+        self.slots = slots or getattr(settings, "STORE_METRICS_WINDOW_SLOTS", 5)
+        self.interval = interval or getattr(
+            settings, "STORE_METRICS_WINDOW_SECONDS", 60
+        )
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def current_window(self):
+        slot = int(time.monotonic() // self.interval)
+        if slot not in self.windows:
+            self.windows[slot] = defaultdict(dict)
+            for stale in [key for key in self.windows if key <= slot - self.slots]:
+                del self.windows[stale]
+        return self.windows[slot]
+
+    def observe(self, view, values):
+        with self.lock:
+            window = self.current_window()
+            for metric, value in values.items():
+                histograms = window[metric]
+                if view not in histograms:
+                    histograms[view] = Histogram(HISTOGRAMS[metric][1])
+                histograms[view].observe(value)
+
+    def increment(self, metric, label):
+        # Counters are cumulative, as Prometheus expects, not windowed.
+        with self.lock:
+            self.counters[metric][label] += 1
+
+    def counter_values(self):
+        with self.lock:
+            return {metric: dict(values) for metric, values in self.counters.items()}
+
+    def snapshot(self):
+        merged = defaultdict(dict)
+        with self.lock:
+            self.current_window()
+            for window in self.windows.values():
+                for metric, histograms in window.items():
+                    for view, histogram in histograms.items():
+                        if view not in merged[metric]:
+                            merged[metric][view] = Histogram(histogram.buckets)
+                        merged[metric][view].merge(histogram)
+        return merged
+
+    def reset(self):
+        with self.lock:
+            self.windows = {}
+            self.counters.clear()
+
+
+def format_prometheus(snapshot, counters=None):
+    lines = []
+    for metric, description in COUNTERS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for alias, value in sorted((counters or {}).get(metric, {}).items()):
+            lines.append(f'{metric}{{alias="{alias}"}} {value}')
+    for metric, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} histogram")
+        for view, histogram in sorted(snapshot.get(metric, {}).items()):
+            label = view.replace("\\", "\\\\").replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'{metric}_bucket{{view="{label}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{metric}_sum{{view="{label}"}} {histogram.sum:.6f}')
+            lines.append(f'{metric}_count{{view="{label}"}} {cumulative}')
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
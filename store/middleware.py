@@ -0,0 +1,136 @@
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from store.metrics import (
+    SerializationTimer,
+    instrument_serializers,
+    registry,
+    serialization_timer,
+)
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, DB time, serialization time (building the response
+    data), render time (encoding it) and total latency per view for a sample
+    of requests (STORE_METRICS_SAMPLE_RATE), feeds the rolling
+    histograms served at /store/metrics/ and adds a Server-Timing header.
+    Unsampled requests pass straight through. Runs natively under both WSGI
+    and ASGI, so async views are not pushed onto a thread by it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "STORE_METRICS_SAMPLE_RATE", 0)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        if self.sample_rate:
+            instrument_serializers()
+
+    def sampled(self):
+        return self.sample_rate and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        started, timer = self.start(request)
+        token = serialization_timer.set(request._serialization)
+        try:
+            with self.timed_queries(timer):
+                response = self.get_response(request)
+        finally:
+            serialization_timer.reset(token)
+        return self.record(request, response, started, timer)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        started, timer = self.start(request)
+        token = serialization_timer.set(request._serialization)
+        # Connections are per thread, and the async ORM runs queries on the
+        # request's sync thread, so install the wrappers there.
+        queries = await sync_to_async(self.timed_queries)(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+            serialization_timer.reset(token)
+        return self.record(request, response, started, timer)
+
+    def start(self, request):
+        request._render_duration = 0
+        request._serialization = SerializationTimer()
+        return time.perf_counter(), QueryTimer()
+
+    def timed_queries(self, timer):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        return stack
+
+    def record(self, request, response, started, timer):
+        total = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "unresolved"
+        registry.observe(
+            view,
+            {
+                "store_request_duration_seconds": total,
+                "store_db_duration_seconds": timer.duration,
+                "store_serialize_duration_seconds": request._serialization.duration,
+                "store_render_duration_seconds": request._render_duration,
+                "store_db_queries": timer.count,
+            },
+        )
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;desc="{timer.count} queries";dur={timer.duration * 1000:.1f}',
+                f"serialize;dur={request._serialization.duration * 1000:.1f}",
+                f"render;dur={request._render_duration * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        if not hasattr(request, "_render_duration"):
+            return response
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._render_duration += time.perf_counter() - started
+
+        response.render = timed_render
+        return response
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:37
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+WEIGHTS = {'title': 3, 'manufacturer': 2, 'description': 1}
+
+
+def build_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX store_product_fulltext_idx '
+            'ON store_product (title, description, manufacturer)'
+        )
+        return
+
+    Product = apps.get_model('store', 'Product')
+    ProductSearchToken = apps.get_model('store', 'ProductSearchToken')
+    tokens = []
+    for product in Product.objects.iterator(chunk_size=1000):
+        weights = Counter()
+        for field, weight in WEIGHTS.items():
+            words = re.findall(r'\w+', getattr(product, field).lower())
+            for token in {word[:64] for word in words}:
+                weights[token] += weight
+        tokens += [
+            ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+            for token, weight in weights.items()
+        ]
+        if len(tokens) >= 1000:
+            ProductSearchToken.objects.bulk_create(tokens, batch_size=1000)
+            tokens = []
+    ProductSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'DROP INDEX store_product_fulltext_idx ON store_product'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_collection_product_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'product'], name='store_search_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 from django.conf import settings
-from django.core.validators import MinLengthValidator, MinValueValidator
+from django.core.validators import (
+    MaxValueValidator,
+    MinLengthValidator,
+    MinValueValidator,
+)
 from uuid import uuid4
 
 from store.validators import validate_file_size
@@ -11,6 +15,7 @@ from store.validators import validate_file_size
 class Collection(models.Model):
     title = models.CharField(max_length=255, validators=[MinLengthValidator(3)])
     image_url = models.CharField(max_length=255)
+    product_count = models.IntegerField(default=0)
 
     def __str__(self) -> str:
         return self.title
@@ -27,20 +32,85 @@ class Product(models.Model):
     )
     manufacturer = models.CharField(max_length=255, default="Apple")
     in_cart = models.BooleanField(default=False)
-    
+    # Bumped by every inventory change and reservation, so writers that
+    # checked stock can tell whether it moved before they wrote.
+    inventory_version = models.PositiveIntegerField(default=0, editable=False)
+    # Review aggregates, kept up to date by store.signals (see
+    # store.counters.adjust_review_stats). average_rating is 0 until a
+    # review with a rating arrives.
+    review_count = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_total = models.IntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["average_rating", "review_count", "id"],
+                name="store_product_rating_idx",
+            ),
+            models.Index(fields=["review_count", "id"], name="store_product_reviews_idx"),
+            models.Index(fields=["title", "id"], name="store_product_title_idx"),
+            models.Index(
+                fields=["collection", "title", "id"],
+                name="store_product_coll_title_idx",
+            ),
+            models.Index(fields=["manufacturer"], name="store_product_manuf_idx"),
+        ]
+
+    # Only ever written with UPDATE ... SET by store.counters. Saving a row
+    # loaded before a review arrived must not put the old values back.
+    COUNTER_FIELDS = ["review_count", "rating_count", "rating_total", "average_rating"]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class ProductSearchToken(models.Model):
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField()
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="search_tokens"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["token", "product"], name="store_search_token_idx"),
+        ]
 
 
 class ProductReview(models.Model):
     description = models.TextField()
+    # 1 to 5 stars; reviews written before ratings existed have none.
+    rating = models.PositiveSmallIntegerField(
+        null=True, validators=[MinValueValidator(1), MaxValueValidator(5)]
+    )
     customer_name = models.CharField(max_length=255)
     date_created = models.DateTimeField(auto_now_add=True)
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="reviews"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product", "date_created", "id"],
+                name="store_review_product_date_idx",
+            ),
+        ]
+
 
 class ProductImage(models.Model):
     image = models.ImageField(upload_to="store/images", validators=[validate_file_size])
+    # Resized copies of `image`, filled in by store.thumbnails as a list of
+    # {"format", "width", "name"}.
+    variants = models.JSONField(default=list, blank=True, editable=False)
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="images"
     )
@@ -83,6 +153,19 @@ class Order(models.Model):
         Customer, on_delete=models.PROTECT, related_name="orders"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["placed_at", "id"], name="store_order_placed_idx"),
+            models.Index(
+                fields=["customer", "placed_at", "id"],
+                name="store_order_cust_placed_idx",
+            ),
+            models.Index(
+                fields=["payment_status", "placed_at"],
+                name="store_order_status_placed_idx",
+            ),
+        ]
+
 
 class OrderItem(models.Model):
     quantity = models.IntegerField(validators=[MinValueValidator(1)])
@@ -103,7 +186,9 @@ class Address(models.Model):
 
 class Cart(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid4)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    total_price = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
 
 
 class CartItem(models.Model):
@@ -115,3 +200,28 @@ class CartItem(models.Model):
 
     class Meta:
         unique_together = [["product", "cart"]]
+
+
+class InventoryReservation(models.Model):
+    """
+    Stock held for a cart until `expires_at`. A product's available stock is
+    its inventory minus its unexpired reservations (see store.inventory).
+    """
+
+    cart = models.ForeignKey(
+        Cart, on_delete=models.CASCADE, related_name="reservations"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="reservations"
+    )
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = [["product", "cart"]]
+        indexes = [
+            models.Index(
+                fields=["product", "expires_at"], name="store_reservation_active_idx"
+            ),
+            models.Index(fields=["expires_at"], name="store_reservation_expiry_idx"),
+        ]
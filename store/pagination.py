@@ -0,0 +1,208 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def seek_filter(ordering, values):
+    """Match the rows that come after `values` in `ordering`."""
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        equal = {
+            prior.lstrip("-"): values[position]
+            for position, prior in enumerate(ordering[:index])
+        }
+        clauses.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+    return reduce(or_, clauses)
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder cuts times down to milliseconds, which would make the
+    seek filter skip rows sharing the boundary millisecond; keep them whole.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the view's ordering columns instead of
+    using OFFSET, so every page costs the same as the first one.
+
+    Per-view options live under REST_FRAMEWORK["KEYSET_PAGINATION"], keyed by
+    the router basename. The last ordering field must be unique (usually "id").
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    default_ordering = ("id",)
+
+    def get_view_config(self, view):
+        config = settings.REST_FRAMEWORK.get("KEYSET_PAGINATION", {})
+        defaults = config.get("default", {})
+        return {**defaults, **config.get(getattr(view, "basename", None), {})}
+
+    def get_ordering(self, config, view):
+        ordering = tuple(config.get("ordering", self.default_ordering))
+        if hasattr(view, "get_keyset_ordering"):
+            ordering = tuple(view.get_keyset_ordering(ordering))
+        return ordering
+
+    def ordering_fields(self, view):
+        ordering = self.get_ordering(self.get_view_config(view), view)
+        return [field.lstrip("-") for field in ordering]
+
+    def get_page_size(self, request, config):
+        page_size = config.get("page_size")
+        max_page_size = config.get("max_page_size", page_size)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested <= 0:
+            return page_size
+        return min(requested, max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view):
+        """
+        Return the (unevaluated) query for the requested page plus one row,
+        which tells whether there is a further page.
+        """
+        config = self.get_view_config(view)
+        self.ordering = self.get_ordering(config, view)
+        self.page_size = self.get_page_size(request, config)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor["r"] if self.cursor else False
+        ordering = self.reversed_ordering() if self.reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor:
+            queryset = queryset.filter(seek_filter(ordering, self.cursor["v"]))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else "-" + field
+            for field in self.ordering
+        )
+
+    def position_of(self, instance):
+        names = [field.lstrip("-") for field in self.ordering]
+        if isinstance(instance, dict):
+            return [instance[name] for name in names]
+        return [getattr(instance, name) for name in names]
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({"v": values, "r": reverse}, cls=CursorEncoder)
+        cursor = b64encode(payload.encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(b64decode(encoded.encode("ascii")).decode("ascii"))
+            raw_values, reverse = payload["v"], bool(payload["r"])
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.to_python(field.lstrip("-"), value)
+                for field, value in zip(self.ordering, raw_values)
+            ]
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return {"v": values, "r": reverse}
+
+    def to_python(self, name, value):
+        if name in self.annotations:
+            # Annotations such as a search rank are checked against their
+            # type like any field, so a forged value never reaches the query.
+            field = self.annotations[name].output_field
+        else:
+            field = self.model._meta.get_field(name)
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.position_of(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.position_of(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
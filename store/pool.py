@@ -0,0 +1,96 @@
+"""
+A bounded pool of DB-API connections, for backends that do not ship one.
+
+Threaded and ASGI servers run requests on threads that come and go, so a
+persistent per-thread connection (CONN_MAX_AGE) is often opened for a
+single request and then abandoned. The pool keeps connections at the
+process level instead. A thread takes one when Django connects and gives
+it back when Django closes it. Idle connections are checked before they are
+handed out again. Connections that have been idle for too long are dropped.
+"""
+from collections import deque
+import threading
+import time
+
+from django.db import OperationalError
+
+
+class ConnectionPool:
+    def __init__(self, max_size=10, timeout=10, max_idle=300, check=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        # Callable that raises if an idle connection is no longer usable.
+        self.check = check
+        self.size = 0
+        self.idle = deque()
+        self.condition = threading.Condition()
+
+    def acquire(self, connect):
+        """
+        Return (connection, reused). Reuses an idle connection when there is
+        a healthy one; otherwise opens one with `connect()` while the pool is
+        below max_size, or waits up to `timeout` seconds for a release.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self.condition:
+                while not self.idle and self.size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OperationalError(
+                            f"No database connection became free within "
+                            f"{self.timeout}s (pool size {self.max_size})."
+                        )
+                    self.condition.wait(remaining)
+                if self.idle:
+                    connection, released_at = self.idle.pop()
+                else:
+                    self.size += 1
+                    connection = None
+
+            if connection is None:
+                try:
+                    return connect(), False
+                except BaseException:
+                    self.forget()
+                    raise
+            # Checked outside the lock: a ping is a network round trip.
+            if time.monotonic() - released_at <= self.max_idle and self.usable(
+                connection
+            ):
+                return connection, True
+            self.discard(connection)
+
+    def release(self, connection):
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def usable(self, connection):
+        if self.check is None:
+            return True
+        try:
+            self.check(connection)
+        except Exception:
+            return False
+        return True
+
+    def discard(self, connection):
+        """Close a connection that is not going back into the pool."""
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self.forget()
+
+    def forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
@@ -0,0 +1,140 @@
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def build_prefetch_plan(serializer):
+    """
+    Walk a serializer's fields and return the (select_related, prefetch_related)
+    lookups needed to render it without per-row queries.
+
+    Nested serializers are followed automatically: a single nested serializer
+    becomes a select_related join, a many=True one becomes a Prefetch whose
+    queryset is itself optimised for the child serializer. Relations read by
+    method fields are declared on the serializer's Meta as `select_related`
+    and `prefetch_related`.
+    """
+    meta = getattr(serializer, "Meta", None)
+    select = list(getattr(meta, "select_related", []))
+    prefetch = list(getattr(meta, "prefetch_related", []))
+
+    for field in serializer.fields.values():
+        if field.source == "*" or field.write_only:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if not isinstance(child, serializers.ModelSerializer):
+                continue
+            queryset = optimize_queryset(child.Meta.model.objects.all(), child)
+            if isinstance(field, LatestListSerializer):
+                prefetch.append(
+                    Prefetch(
+                        field.source,
+                        queryset=field.latest(queryset),
+                        to_attr=field.prefetch_to_attr,
+                    )
+                )
+            else:
+                prefetch.append(Prefetch(field.source, queryset=queryset))
+        elif isinstance(field, serializers.ModelSerializer):
+            child_select, child_prefetch = build_prefetch_plan(field)
+            select.append(field.source)
+            select += [f"{field.source}__{lookup}" for lookup in child_select]
+            prefetch += [
+                _prefix_prefetch(field.source, lookup) for lookup in child_prefetch
+            ]
+
+    return select, prefetch
+
+
+class LatestListSerializer(serializers.ListSerializer):
+    """
+    Many=True serializer that renders only the first `limit` related objects
+    by `ordering`. The prefetch plan reads them into `latest_<source>` with a
+    sliced Prefetch, which Django runs as one ROW_NUMBER() window query for
+    the whole page.
+    """
+
+    def __init__(self, *args, ordering, limit, **kwargs):
+        self.ordering = ordering
+        self.limit = limit
+        super().__init__(*args, **kwargs)
+
+    @property
+    def prefetch_to_attr(self):
+        return f"latest_{self.source}"
+
+    def latest(self, queryset):
+        return queryset.order_by(*self.ordering)[: self.limit]
+
+    def get_attribute(self, instance):
+        if hasattr(instance, self.prefetch_to_attr):
+            return getattr(instance, self.prefetch_to_attr)
+        # Not prefetched (e.g. the response to a write): slice in SQL rather
+        # than loading every related row.
+        return self.latest(super().get_attribute(instance).all())
+
+
+def _prefix_prefetch(prefix, lookup):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            f"{prefix}__{lookup.prefetch_through}",
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr,
+        )
+    return f"{prefix}__{lookup}"
+
+
+def optimize_queryset(queryset, serializer):
+    select, prefetch = build_prefetch_plan(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+def serializer_columns(serializer):
+    """
+    Return the model columns a flat serializer reads, or None when it reads
+    through relations or methods that only() could not account for.
+    """
+    model = serializer.Meta.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    columns = {model._meta.pk.name}
+    for field in serializer.fields.values():
+        if field.write_only or isinstance(field, serializers.ListSerializer):
+            continue
+        if field.source not in concrete:
+            return None
+        columns.add(field.source)
+    return columns
+
+
+class SerializerPrefetchMixin:
+    """
+    Viewset mixin that applies the prefetch plan of the serializer in use to
+    every queryset the view reads, for both list and detail requests. When a
+    read asks for a sparse fieldset, only the columns it needs are loaded.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        queryset = optimize_queryset(queryset, serializer)
+
+        if (
+            self.request.method in SAFE_METHODS
+            and "fields" in self.request.query_params
+        ):
+            columns = serializer_columns(serializer)
+            if columns:
+                queryset = queryset.only(*columns, *self.ordering_columns(queryset))
+        return queryset
+
+    def ordering_columns(self, queryset):
+        paginator = self.paginator
+        if paginator is None or not hasattr(paginator, "ordering_fields"):
+            return []
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        return [name for name in paginator.ordering_fields(self) if name in concrete]
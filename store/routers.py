@@ -0,0 +1,182 @@
+"""
+Read-replica routing.
+
+Reads go to the primary unless the code serving the request opted in with
+allow_replica_reads(). The catalogue viewsets do that for safe methods, and
+the order exports use reporting_database(). Opted-in reads use a random
+healthy alias from DATABASE_READ_REPLICAS, picked on the request's first read
+and kept for the rest of it.
+
+Read-your-writes:
+- The first write in a request pins the rest of that request to the primary.
+- ReplicaPinMiddleware also sets a short-lived cookie, so the next few
+  requests from the same client stay on the primary while replicas catch up.
+
+A replica that is not configured, or whose connection fails, is skipped. A
+failed replica is retried after STORE_REPLICA_RETRY_SECONDS.
+"""
+from contextvars import ContextVar
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "store_primary"
+
+_state = ContextVar("store_db_routing", default=None)
+_replica_down_until = {}
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.allow_replica = False
+        self.wrote = False
+        # The alias this request reads from once it has chosen one.
+        self.replica = None
+
+
+def allow_replica_reads():
+    """Let the rest of the current request read from a replica."""
+    state = _state.get()
+    if state is not None:
+        state.allow_replica = True
+
+
+def configured_replicas():
+    return [
+        alias
+        for alias in getattr(settings, "DATABASE_READ_REPLICAS", [])
+        if alias in connections.settings
+    ]
+
+
+def healthy_replica():
+    """
+    Return a reachable replica alias, or None when there is none. A replica
+    whose connection fails is skipped for STORE_REPLICA_RETRY_SECONDS.
+    """
+    now = time.monotonic()
+    candidates = [
+        alias
+        for alias in configured_replicas()
+        if _replica_down_until.get(alias, 0) <= now
+    ]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            logger.warning("Read replica %s is unavailable", alias, exc_info=True)
+            retry = getattr(settings, "STORE_REPLICA_RETRY_SECONDS", 30)
+            _replica_down_until[alias] = now + retry
+            continue
+        return alias
+    return None
+
+
+def request_replica(state):
+    """
+    The alias `state`'s request reads from. Choosing once keeps every read of
+    the request on one consistent copy, and checks the connection only once.
+    """
+    if state.replica is None:
+        state.replica = healthy_replica() or DEFAULT_DB_ALIAS
+    return state.replica
+
+
+def reporting_database():
+    """
+    The alias for a long read that tolerates replica lag, such as an export.
+    Falls back to the primary when the request is pinned or no replica is up.
+    """
+    state = _state.get()
+    if state is None:
+        return healthy_replica() or DEFAULT_DB_ALIAS
+    if state.pinned:
+        return DEFAULT_DB_ALIAS
+    return request_replica(state)
+
+
+class ReplicaReadMixin:
+    """Viewset mixin that lets safe requests read from a replica."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            allow_replica_reads()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.allow_replica or state.pinned:
+            return DEFAULT_DB_ALIAS
+        return request_replica(state)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in getattr(settings, "DATABASE_READ_REPLICAS", [])
+
+
+class ReplicaPinMiddleware:
+    """
+    Tracks routing per request: honours the pin cookie on the way in and,
+    when the request wrote anything, sets it for STORE_REPLICA_PIN_SECONDS
+    on the way out.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "STORE_REPLICA_PIN_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
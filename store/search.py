@@ -0,0 +1,100 @@
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from rest_framework.filters import BaseFilterBackend
+
+from store.models import Product, ProductSearchToken
+
+SEARCH_PARAM = "search"
+SEARCH_FIELD_WEIGHTS = {"title": 3, "manufacturer": 2, "description": 1}
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def uses_fulltext():
+    return connection.vendor == "mysql"
+
+
+def product_tokens(product):
+    weights = Counter()
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        for token in set(tokenize(getattr(product, field) or "")):
+            weights[token] += weight
+    return [
+        ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+        for token, weight in weights.items()
+    ]
+
+
+def index_products(products):
+    if uses_fulltext():
+        return 0
+    products = [product for product in products if product.pk is not None]
+    ProductSearchToken.objects.filter(
+        product_id__in=[product.pk for product in products]
+    ).delete()
+    tokens = [token for product in products for token in product_tokens(product)]
+    ProductSearchToken.objects.bulk_create(tokens, batch_size=1000)
+    return len(tokens)
+
+
+def prefix_match(term):
+    # A range on the indexed column instead of LIKE 'term%', which SQLite
+    # cannot serve from an index when Django adds an ESCAPE clause.
+    return Q(token__gte=term, token__lt=term + "\uffff")
+
+
+def search_products(queryset, query):
+    """
+    Filter `queryset` to products matching every term of `query` (each term as
+    a prefix) and annotate a `search_rank` relevance score.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset.none()
+
+    if uses_fulltext():
+        table = Product._meta.db_table
+        rank = RawSQL(
+            f"MATCH ({table}.title, {table}.description, {table}.manufacturer) "
+            "AGAINST (%s IN BOOLEAN MODE)",
+            (" ".join(f"+{term}*" for term in terms),),
+            output_field=FloatField(),
+        )
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+    for term in terms:
+        queryset = queryset.filter(
+            pk__in=ProductSearchToken.objects.filter(prefix_match(term)).values(
+                "product_id"
+            )
+        )
+    matching = Q()
+    for term in terms:
+        matching |= prefix_match(term)
+    rank = (
+        ProductSearchToken.objects.filter(matching, product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(rank=Sum("weight"))
+        .values("rank")
+    )
+    return queryset.annotate(search_rank=Coalesce(Subquery(rank), 0))
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(SEARCH_PARAM)
+        if not query:
+            return queryset
+        return search_products(queryset, query)
@@ -1,6 +1,23 @@
-from rest_framework import serializers
+from django.conf import settings
 from django.db import transaction
-
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import SAFE_METHODS
+
+from store.caching import invalidate_catalogue
+from store.carts import add_cart_item, apply_cart_delta
+from store.filters import REVIEW_ORDERING
+from store.inventory import (
+    CONFLICT_MESSAGE,
+    InsufficientStock,
+    StaleInventory,
+    commit_cart,
+    release,
+    reserve,
+    retry_on_conflict,
+    set_inventory,
+)
 from store.models import (
     Address,
     Cart,
@@ -13,9 +30,53 @@ from store.models import (
     ProductImage,
     ProductReview,
 )
-
-
-class CollectionSerializer(serializers.ModelSerializer):
+from store.prefetch import LatestListSerializer
+from store.thumbnails import srcsets, variant_urls
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests pick fields with ?fields=id,title and nested relations
+    with ?expand=images. Without either parameter every field is returned.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+        if not self.is_root_serializer():
+            return fields
+
+        params = request.query_params
+        requested = split_param(params["fields"]) if "fields" in params else None
+        expanded = split_param(params["expand"]) if "expand" in params else None
+
+        for name, field in list(fields.items()):
+            nested = isinstance(field, serializers.BaseSerializer)
+            wanted = requested is None or name in requested
+            if nested and expanded is not None:
+                wanted = name in expanded
+            elif expanded is not None and name in expanded:
+                wanted = True
+            if not wanted:
+                del fields[name]
+        return fields
+
+    def is_root_serializer(self):
+        if self.parent is None:
+            return True
+        return (
+            isinstance(self.parent, serializers.ListSerializer)
+            and self.parent.parent is None
+        )
+
+
+class CollectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_count = serializers.IntegerField(read_only=True)
 
     class Meta:
@@ -23,35 +84,78 @@ class CollectionSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "product_count", "image_url"]
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ["id", "image"]
+        fields = ["id", "image", "variants", "srcset"]
+
+    def get_variants(self, image):
+        def url(name):
+            url = image.image.storage.url(name)
+            request = self.context.get("request")
+            return request.build_absolute_uri(url) if request else url
+
+        return variant_urls(image.variants, url)
+
+    def get_srcset(self, image):
+        return srcsets(self.get_variants(image))
 
     def create(self, validated_data):
         product_id = self.context["product_id"]
         return ProductImage.objects.create(product_id=product_id, **validated_data)
 
 
-class ProductReviewSerializer(serializers.ModelSerializer):
+class ProductReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductReview
-        fields = ["id", "customer_name", "description", "date_created"]
+        fields = ["id", "customer_name", "description", "rating", "date_created"]
+        extra_kwargs = {"rating": {"required": True, "allow_null": False}}
 
     def create(self, validated_data):
         product_id = self.context["product_id"]
         return ProductReview.objects.create(product_id=product_id, **validated_data)
 
 
-class PatchProductSerializer(serializers.ModelSerializer):
+class ProductUpdateMixin:
+    """
+    Saves only the columns a request sent. Carts and checkouts change
+    inventory all the time, so it is never written back from the loaded row,
+    and a new value goes through the version check like the admin's.
+    """
+
+    def update(self, instance, validated_data):
+        inventory = validated_data.pop("inventory", instance.inventory)
+        with transaction.atomic():
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            instance.save(update_fields=[*validated_data, "last_update"])
+            if inventory != instance.inventory:
+                if not set_inventory(
+                    instance.pk, inventory, instance.inventory_version
+                ):
+                    raise serializers.ValidationError(
+                        {"inventory": [CONFLICT_MESSAGE]}
+                    )
+                instance.inventory = inventory
+                instance.inventory_version += 1
+        return instance
+
+
+class PatchProductSerializer(ProductUpdateMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ["in_cart"]
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(
+    ProductUpdateMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     images = ProductImageSerializer(many=True, read_only=True)
     reviews = ProductReviewSerializer(many=True, read_only=True)
+    reviews_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -65,17 +169,42 @@ class ProductSerializer(serializers.ModelSerializer):
             "in_cart",
             "images",
             "reviews",
+            "reviews_url",
             "manufacturer",
+            "review_count",
+            "average_rating",
         ]
 
+    def get_fields(self):
+        # With STORE_EMBEDDED_REVIEWS set, "reviews" holds only the newest
+        # reviews and "reviews_url" points at the paginated list of all of
+        # them; unset, every review is embedded as before.
+        fields = super().get_fields()
+        limit = getattr(settings, "STORE_EMBEDDED_REVIEWS", None)
+        if limit is None:
+            fields.pop("reviews_url", None)
+        elif "reviews" in fields:
+            fields["reviews"] = LatestListSerializer(
+                child=ProductReviewSerializer(),
+                ordering=REVIEW_ORDERING,
+                limit=limit,
+                read_only=True,
+            )
+        return fields
+
+    def get_reviews_url(self, product):
+        url = reverse("product_reviews-list", kwargs={"product_pk": product.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
-class CustomerSerializer(serializers.ModelSerializer):
+
+class CustomerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ["id", "phone", "birth_date", "membership", "user"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["id", "placed_at", "payment_status", "customer"]
@@ -84,28 +213,54 @@ class OrderSerializer(serializers.ModelSerializer):
 class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
-    def save(self, **kwargs):
-        with transaction.atomic():
-            cart_id = self.validated_data["cart_id"]
-            user_id = self.context["user_id"]
-            customer = Customer.objects.get(user_id=user_id)
-
-            order = Order.objects.create(customer=customer)
+    def validate_cart_id(self, cart_id):
+        if not Cart.objects.filter(pk=cart_id).exists():
+            raise serializers.ValidationError("No cart with the given ID was found.")
+        if not CartItem.objects.filter(cart_id=cart_id).exists():
+            raise serializers.ValidationError("The cart is empty.")
+        return cart_id
 
-            cart_items = CartItem.objects.filter(cart_id=cart_id)
-            order_items = [
+    def save(self, **kwargs):
+        try:
+            return retry_on_conflict(self.place_order)
+        except InsufficientStock as error:
+            raise serializers.ValidationError({"cart_id": [str(error)]})
+        except StaleInventory:
+            raise serializers.ValidationError({"cart_id": [CONFLICT_MESSAGE]})
+
+    def place_order(self):
+        cart_id = self.validated_data["cart_id"]
+        user_id = self.context["user_id"]
+        customer = Customer.objects.get(user_id=user_id)
+
+        cart_items = list(
+            CartItem.objects.filter(cart_id=cart_id).values_list(
+                "product_id", "quantity", "product__price"
+            )
+        )
+        if not cart_items:
+            # A checkout submitted twice: the other request took the cart.
+            raise serializers.ValidationError({"cart_id": ["The cart is empty."]})
+        quantities = {product_id: quantity for product_id, quantity, _ in cart_items}
+        commit_cart(cart_id, quantities)
+        # After commit, so a read in between cannot cache the old stock again.
+        transaction.on_commit(invalidate_catalogue)
+
+        order = Order.objects.create(customer=customer)
+        OrderItem.objects.bulk_create(
+            [
                 OrderItem(
-                    quantity=item.quantity,
-                    unit_price=item.product.price,
+                    quantity=quantity,
+                    unit_price=price,
                     order=order,
-                    product=item.product,
+                    product_id=product_id,
                 )
-                for item in cart_items
+                for product_id, quantity, price in cart_items
             ]
-            OrderItem.objects.bulk_create(order_items)
+        )
 
-            Cart.objects.filter(pk=cart_id).delete()
-            return order
+        Cart.objects.filter(pk=cart_id).delete()
+        return order
 
 
 class UpdateOrderSerializer(serializers.ModelSerializer):
@@ -114,13 +269,13 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
         fields = ["payment_status"]
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = OrderItem
         fields = ["id", "quantity", "unit_price", "order", "product"]
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = ["id", "street", "city", "customer"]
@@ -132,7 +287,7 @@ class SimpleProductSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "price"]
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = SimpleProductSerializer()
     total_price = serializers.SerializerMethodField(method_name="item_total_price")
 
@@ -147,22 +302,28 @@ class CartItemSerializer(serializers.ModelSerializer):
 class AddCartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
-    def save(self, **kwargs):
-        cart_id = self.context["cart_id"]
-        product_id = self.validated_data["product_id"]
-        quantity = self.validated_data["quantity"]
+    def validate_product_id(self, value):
+        self.product_price = (
+            Product.objects.filter(pk=value).values_list("price", flat=True).first()
+        )
+        if self.product_price is None:
+            raise serializers.ValidationError("No product with the given ID was found.")
+        return value
 
+    def save(self, **kwargs):
         try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(
-                cart_id=cart_id, **self.validated_data
+            self.instance = add_cart_item(
+                self.context["cart_id"],
+                self.validated_data["product_id"],
+                self.validated_data["quantity"],
+                self.product_price,
             )
-
+        except InsufficientStock as error:
+            raise serializers.ValidationError({"quantity": [str(error)]})
+        except StaleInventory:
+            raise serializers.ValidationError({"quantity": [CONFLICT_MESSAGE]})
+        if self.instance is None:
+            raise NotFound("No cart with the given ID was found.")
         return self.instance
 
     class Meta:
@@ -170,20 +331,58 @@ class AddCartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "quantity", "product_id"]
 
 
+class AsyncAddCartItemSerializer(serializers.Serializer):
+    """
+    Checks the shape of an add-to-cart request without touching the database,
+    so the async view can validate it on the event loop.
+    """
+
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
 class UpdateCartItemSerializer(serializers.ModelSerializer):
+    def update(self, instance, validated_data):
+        try:
+            return retry_on_conflict(
+                self.apply_update, instance, validated_data["quantity"]
+            )
+        except InsufficientStock as error:
+            raise serializers.ValidationError({"quantity": [str(error)]})
+        except StaleInventory:
+            raise serializers.ValidationError({"quantity": [CONFLICT_MESSAGE]})
+
+    def apply_update(self, instance, quantity):
+        previous_quantity = instance.quantity
+        items = CartItem.objects.filter(pk=instance.pk)
+        # Only write over the quantity we read: the reservation is adjusted
+        # by the difference, so it must be the difference from what is stored.
+        if not items.filter(quantity=previous_quantity).update(quantity=quantity):
+            current = items.values_list("quantity", flat=True).first()
+            if current is None:
+                raise NotFound()
+            instance.quantity = current
+            raise StaleInventory()
+        delta = quantity - previous_quantity
+        if delta > 0:
+            reserve(instance.cart_id, instance.product_id, delta)
+        elif delta < 0:
+            release(instance.cart_id, instance.product_id, -delta)
+        apply_cart_delta(instance.cart_id, delta, instance.product.price)
+        instance.quantity = quantity
+        return instance
+
     class Meta:
         model = CartItem
         fields = ["quantity"]
 
 
-class CartSerializer(serializers.ModelSerializer):
-    cart_total_price = serializers.SerializerMethodField(method_name="get_total_price")
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    cart_total_price = serializers.IntegerField(source="total_price", read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
     id = serializers.UUIDField(read_only=True)
     items = CartItemSerializer(many=True, read_only=True)
 
-    def get_total_price(self, cart):
-        return sum([item.quantity * item.product.price for item in cart.items.all()])
-
     class Meta:
         model = Cart
-        fields = ["id", "items", "cart_total_price"]
+        fields = ["id", "items", "item_count", "cart_total_price"]
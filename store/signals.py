@@ -1,6 +1,14 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import Customer
+from .caching import invalidate_catalogue
+from .carts import recalculate_cart_totals
+from .counters import adjust_product_count, adjust_review_stats
+from .metrics import registry
+from .search import index_products
+from .thumbnails import delete_variants, schedule_variants
+from .models import Cart, Collection, Customer, Product, ProductImage, ProductReview
 from django.conf import settings
 
 
@@ -8,3 +16,97 @@ from django.conf import settings
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs["created"]:
         Customer.objects.create(user=kwargs["instance"])
+
+
+@receiver(post_save, sender=Product)
+def refresh_cart_totals_for_product(sender, **kwargs):
+    if not kwargs["created"]:
+        recalculate_cart_totals(Cart.objects.filter(items__product=kwargs["instance"]))
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_collection(sender, instance, **kwargs):
+    instance._previous_collection_id = None
+    update_fields = kwargs["update_fields"]
+    if instance._state.adding or (update_fields and "collection" not in update_fields):
+        return
+    instance._previous_collection_id = (
+        Product.objects.filter(pk=instance.pk)
+        .values_list("collection_id", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_collection_product_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_product_count(instance.collection_id, 1)
+        return
+    previous_collection_id = instance._previous_collection_id
+    if previous_collection_id and previous_collection_id != instance.collection_id:
+        adjust_product_count(previous_collection_id, -1)
+        adjust_product_count(instance.collection_id, 1)
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, **kwargs):
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def decrement_collection_product_count(sender, instance, **kwargs):
+    adjust_product_count(instance.collection_id, -1)
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance._state.adding:
+        return
+    instance._previous_rating = (
+        ProductReview.objects.filter(pk=instance.pk)
+        .values_list("rating", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=ProductReview)
+def update_product_review_stats(sender, instance, created, **kwargs):
+    if created:
+        adjust_review_stats(instance.product_id, 1, added_rating=instance.rating)
+    elif instance._previous_rating != instance.rating:
+        adjust_review_stats(
+            instance.product_id,
+            added_rating=instance.rating,
+            removed_rating=instance._previous_rating,
+        )
+
+
+@receiver(post_delete, sender=ProductReview)
+def remove_product_review_stats(sender, instance, **kwargs):
+    adjust_review_stats(instance.product_id, -1, removed_rating=instance.rating)
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_product_image_variants(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or "image" in update_fields:
+        schedule_variants(instance.pk)
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_product_image_variants(sender, instance, **kwargs):
+    storage = instance.image.storage
+    transaction.on_commit(lambda: delete_variants(storage, instance.variants))
+
+
+@receiver(connection_created)
+def count_database_connection(sender, connection, **kwargs):
+    if getattr(connection, "reused_connection", False):
+        registry.increment("store_db_connections_reused_total", connection.alias)
+    else:
+        registry.increment("store_db_connections_opened_total", connection.alias)
+
+
+for catalogue_model in [Product, Collection, ProductImage, ProductReview]:
+    post_save.connect(invalidate_catalogue, sender=catalogue_model)
+    post_delete.connect(invalidate_catalogue, sender=catalogue_model)
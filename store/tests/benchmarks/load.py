@@ -0,0 +1,157 @@
+"""
+Concurrent in-process load driver.
+
+Each worker thread gets its own APIClient (and so its own DB connection) and
+sends the requests of a scenario in turn. Query counts are read from the
+Server-Timing header added by store.middleware.RequestMetricsMiddleware, so
+the suite runs with STORE_METRICS_SAMPLE_RATE = 1.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import re
+from statistics import mean, quantiles
+import threading
+import time
+
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+QUERY_COUNT_PATTERN = re.compile(r'db;desc="(\d+) queries"')
+
+
+@dataclass
+class Call:
+    method: str
+    url: str
+    data: dict = None
+    user: object = None
+    expected_status: int = 200
+
+
+@dataclass
+class Result:
+    name: str
+    latencies: list
+    queries: list
+    elapsed: float
+
+    def summary(self):
+        percentiles = quantiles(self.latencies, n=100, method="inclusive")
+        return {
+            "requests": len(self.latencies),
+            "p50_ms": round(percentiles[49] * 1000, 2),
+            "p95_ms": round(percentiles[94] * 1000, 2),
+            "p99_ms": round(percentiles[98] * 1000, 2),
+            "rps": round(len(self.latencies) / self.elapsed, 1),
+            "queries_per_request": round(mean(self.queries), 2),
+            "max_queries": max(self.queries),
+        }
+
+
+def supports_concurrent_writes():
+    # SQLite fails transactions that read and then write with "database is
+    # locked" when another writer holds the lock (in memory it does not even
+    # wait), so write scenarios run one at a time there.
+    return connection.vendor != "sqlite"
+
+
+def run_load(name, calls, concurrency):
+    """
+    Send `calls` from `concurrency` threads and collect per-request latency
+    and query counts. Any unexpected status fails the run.
+    """
+    calls = list(calls)
+    lock = threading.Lock()
+    latencies, queries = [], []
+    local = threading.local()
+
+    def send(call):
+        if not hasattr(local, "client"):
+            local.client, local.user = APIClient(), None
+        client = local.client
+        if call.user != local.user:
+            # Switching back to anonymous logs out, which writes the session.
+            client.force_authenticate(user=call.user)
+            local.user = call.user
+        started = time.perf_counter()
+        response = getattr(client, call.method)(call.url, call.data, format="json")
+        duration = time.perf_counter() - started
+        assert response.status_code == call.expected_status, (
+            f"{name}: {call.method.upper()} {call.url} returned "
+            f"{response.status_code}: {getattr(response, 'data', '')}"
+        )
+        match = QUERY_COUNT_PATTERN.search(response.get("Server-Timing", ""))
+        with lock:
+            latencies.append(duration)
+            queries.append(int(match.group(1)) if match else 0)
+
+    def worker(chunk):
+        try:
+            for call in chunk:
+                send(call)
+        finally:
+            connections.close_all()
+
+    chunks = [calls[index::concurrency] for index in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker, chunk) for chunk in chunks]:
+            future.result()
+    return Result(name, latencies, queries, time.perf_counter() - started)
+
+
+def load_baseline():
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text())
+
+
+def save_baseline(scale, summaries):
+    # Only query counts: latency depends on the machine that ran the benchmark.
+    baseline = {
+        "scale": scale,
+        "scenarios": {
+            name: {"max_queries": summary["max_queries"]}
+            for name, summary in sorted(summaries.items())
+        },
+    }
+    BASELINE_PATH.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def compare_to_baseline(baseline, summaries):
+    """
+    Return a list of regressions: scenarios that ran more queries per request
+    than the baseline allows. Latency is reported, never compared.
+    """
+    regressions = []
+    for name, summary in summaries.items():
+        expected = baseline.get("scenarios", {}).get(name)
+        if expected is None:
+            continue
+        if summary["max_queries"] > expected["max_queries"]:
+            regressions.append(
+                f"{name}: {summary['max_queries']} queries per request, "
+                f"baseline {expected['max_queries']}"
+            )
+    return regressions
+
+
+def format_report(summaries):
+    columns = [
+        "requests",
+        "p50_ms",
+        "p95_ms",
+        "p99_ms",
+        "rps",
+        "queries_per_request",
+        "max_queries",
+    ]
+    width = max(len(name) for name in summaries)
+    lines = ["scenario".ljust(width) + "".join(f"  {c}" for c in columns)]
+    for name, summary in summaries.items():
+        cells = "".join(f"  {summary[c]:>{len(c)}}" for c in columns)
+        lines.append(name.ljust(width) + cells)
+    return "\n".join(lines)
@@ -0,0 +1,121 @@
+"""
+Seed a store-sized dataset for the benchmark suite.
+
+FULL_SCALE is the target shape of the catalogue; BENCHMARK_SCALE (default
+0.01) shrinks it proportionally so the suite stays quick on a laptop. Rows are
+prepared with model-bakery and written with bulk_create, so the denormalized
+counters and the search index are rebuilt afterwards the same way the repair
+commands do.
+"""
+from itertools import cycle
+import os
+import random
+
+from model_bakery import baker
+
+from store.carts import recalculate_cart_totals
+from store.counters import recount_collection_products
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Customer,
+    Order,
+    OrderItem,
+    Product,
+    ProductReview,
+)
+from store.search import index_products
+from user.models import User
+
+FULL_SCALE = {
+    "collections": 2_000,
+    "products": 200_000,
+    "reviews": 400_000,
+    "customers": 5_000,
+    "carts": 20_000,
+    "orders": 50_000,
+}
+ITEMS_PER_CART = 3
+ITEMS_PER_ORDER = 3
+BATCH_SIZE = 2_000
+
+
+def benchmark_scale():
+    return float(os.environ.get("BENCHMARK_SCALE", "0.01"))
+
+
+def scaled_sizes(scale):
+    return {name: max(1, int(size * scale)) for name, size in FULL_SCALE.items()}
+
+
+def create_in_batches(model, count, **attrs):
+    created = []
+    for start in range(0, count, BATCH_SIZE):
+        rows = baker.prepare(model, _quantity=min(BATCH_SIZE, count - start), **attrs)
+        rows = model.objects.bulk_create(rows)
+        if rows[0].pk is None:
+            # Backends that cannot return ids from bulk inserts (MySQL).
+            rows = list(model.objects.order_by("-pk")[: len(rows)])[::-1]
+        created += rows
+    return created
+
+
+def seed_store(scale=None, seed=1234):
+    """
+    Fill the database and return the ids the load scenarios pick from.
+    """
+    sizes = scaled_sizes(benchmark_scale() if scale is None else scale)
+    random.seed(seed)
+
+    collections = create_in_batches(Collection, sizes["collections"])
+    products = create_in_batches(
+        Product,
+        sizes["products"],
+        collection=cycle(collections),
+        price=cycle(range(1, 1_000)),
+        inventory=1_000_000,
+    )
+    create_in_batches(
+        ProductReview,
+        sizes["reviews"],
+        product=cycle(random.sample(products, len(products))),
+    )
+    users = create_in_batches(
+        User,
+        sizes["customers"],
+        username=(f"bench{index}" for index in range(sizes["customers"])),
+        email=(f"bench{index}@example.com" for index in range(sizes["customers"])),
+    )
+    customers = create_in_batches(Customer, len(users), user=iter(users))
+
+    carts = create_in_batches(Cart, sizes["carts"])
+    create_in_batches(
+        CartItem,
+        len(carts) * ITEMS_PER_CART,
+        cart=(cart for cart in carts for _ in range(ITEMS_PER_CART)),
+        product=cycle(random.sample(products, len(products))),
+        quantity=cycle(range(1, 5)),
+    )
+    orders = create_in_batches(Order, sizes["orders"], customer=cycle(customers))
+    create_in_batches(
+        OrderItem,
+        len(orders) * ITEMS_PER_ORDER,
+        order=(order for order in orders for _ in range(ITEMS_PER_ORDER)),
+        product=cycle(random.sample(products, len(products))),
+        quantity=cycle(range(1, 5)),
+        unit_price=cycle(range(1, 1_000)),
+    )
+
+    recount_collection_products()
+    recalculate_cart_totals()
+    for start in range(0, len(products), BATCH_SIZE):
+        index_products(products[start : start + BATCH_SIZE])
+
+    return {
+        "sizes": sizes,
+        "collection_ids": [collection.id for collection in collections],
+        "product_ids": [product.id for product in products],
+        "cart_ids": [str(cart.id) for cart in carts],
+        "user_ids": [user.id for user in users],
+    }
@@ -0,0 +1,98 @@
+"""
+Load benchmark for the main store routes.
+
+    pytest -m benchmark store/tests/benchmarks/test_api_benchmark.py -s
+
+Environment: BENCHMARK_SCALE (dataset size, 1 = full), BENCHMARK_REQUESTS
+(per scenario), BENCHMARK_CONCURRENCY and BENCHMARK_UPDATE_BASELINE=1 to
+rewrite the baseline from this run instead of comparing against it.
+
+The test fails when a scenario runs more queries per request than
+baseline.json records. Latencies depend on the machine, so they are only
+printed: compare them with a run of the base branch on the same host.
+"""
+from itertools import cycle, islice
+import os
+
+import pytest
+
+from store.tests.benchmarks.load import (
+    Call,
+    compare_to_baseline,
+    format_report,
+    load_baseline,
+    run_load,
+    save_baseline,
+    supports_concurrent_writes,
+)
+from store.tests.benchmarks.seed import benchmark_scale, seed_store
+from user.models import User
+
+
+def take(values, count):
+    return list(islice(cycle(values), count))
+
+
+def scenarios(seeded, count):
+    collection_ids = seeded["collection_ids"]
+    product_ids = seeded["product_ids"]
+    cart_ids = seeded["cart_ids"]
+    customer = User.objects.get(pk=seeded["user_ids"][0])
+    buyers = User.objects.filter(pk__in=seeded["user_ids"])
+
+    yield "product_list", False, [
+        Call("get", f"/store/products/?collection_id={collection_id}")
+        for collection_id in take(collection_ids, count)
+    ]
+    yield "product_detail", False, [
+        Call("get", f"/store/products/{product_id}/")
+        for product_id in take(product_ids[::7], count)
+    ]
+    yield "cart_read", False, [
+        Call("get", f"/store/carts/{cart_id}/") for cart_id in take(cart_ids, count)
+    ]
+    yield "cart_add", True, [
+        Call(
+            "post",
+            f"/store/carts/{cart_id}/items/",
+            {"product_id": product_id, "quantity": 1},
+            expected_status=201,
+        )
+        for cart_id, product_id in zip(
+            take(cart_ids, count), take(product_ids[::-3], count)
+        )
+    ]
+    yield "order_list", False, [
+        Call("get", "/store/orders/", user=customer) for _ in range(count)
+    ]
+    # Checkout consumes its cart, so it runs last and once per cart.
+    yield "checkout", True, [
+        Call("post", "/store/orders/", {"cart_id": cart_id}, user=buyer)
+        for cart_id, buyer in zip(cart_ids[:count], cycle(buyers))
+    ]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_store_api_load(settings):
+    settings.STORE_METRICS_SAMPLE_RATE = 1
+    scale = benchmark_scale()
+    count = int(os.environ.get("BENCHMARK_REQUESTS", "200"))
+    concurrency = int(os.environ.get("BENCHMARK_CONCURRENCY", "4"))
+
+    seeded = seed_store(scale)
+    summaries = {}
+    for name, writes, calls in scenarios(seeded, count):
+        workers = concurrency if not writes or supports_concurrent_writes() else 1
+        if not writes:
+            run_load(name, calls[: concurrency * 2], workers)  # warm up
+        summaries[name] = run_load(name, calls, workers).summary()
+
+    print(f"\nscale {scale}, {seeded['sizes']}, concurrency {concurrency}")
+    print(format_report(summaries))
+
+    if os.environ.get("BENCHMARK_UPDATE_BASELINE") == "1":
+        save_baseline(scale, summaries)
+        return
+    regressions = compare_to_baseline(load_baseline(), summaries)
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,129 @@
+"""
+Compares the async endpoints under ASGI with the regular views under WSGI at
+growing numbers of in-flight requests.
+
+    pytest -m benchmark store/tests/benchmarks/test_asgi_benchmark.py -s
+
+Besides latency and throughput it records the peak number of threads. Under
+WSGI every in-flight request holds one. ASGI requests run in their own
+ThreadSensitiveContext, as ASGIHandler does, so each still gets a thread for
+its ORM calls; async views save threads while waiting on clients, not on the
+database. The WSGI product detail is served from the catalogue cache.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+import threading
+import time
+
+from asgiref.sync import ThreadSensitiveContext
+from django.db import connections
+from django.test import AsyncClient
+import pytest
+from rest_framework.test import APIClient
+
+from store.tests.benchmarks.load import QUERY_COUNT_PATTERN, Result, format_report
+from store.tests.benchmarks.seed import seed_store
+
+CONCURRENCY_LEVELS = (1, 16, 64)
+REQUESTS_PER_LEVEL = 256
+
+
+class PeakThreads:
+    def __init__(self):
+        self.peak = threading.active_count()
+
+    def sample(self):
+        self.peak = max(self.peak, threading.active_count())
+
+
+def query_count(response):
+    match = QUERY_COUNT_PATTERN.search(response.get("Server-Timing", ""))
+    return int(match.group(1)) if match else 0
+
+
+def run_wsgi(urls, concurrency, threads):
+    latencies, queries = [], []
+
+    def worker(chunk):
+        client = APIClient()
+        try:
+            for url in chunk:
+                threads.sample()
+                started = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - started)
+                queries.append(query_count(response))
+                assert response.status_code == 200, url
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        chunks = [urls[index::concurrency] for index in range(concurrency)]
+        for future in [executor.submit(worker, chunk) for chunk in chunks]:
+            future.result()
+    return Result("wsgi", latencies, queries, time.perf_counter() - started)
+
+
+async def run_asgi(urls, concurrency, threads):
+    latencies, queries = [], []
+    client = AsyncClient()
+    in_flight = asyncio.Semaphore(concurrency)
+
+    async def send(url):
+        async with in_flight:
+            threads.sample()
+            started = time.perf_counter()
+            async with ThreadSensitiveContext():
+                response = await client.get(url)
+            latencies.append(time.perf_counter() - started)
+            queries.append(query_count(response))
+            assert response.status_code == 200, url
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(url) for url in urls))
+    return Result("asgi", latencies, queries, time.perf_counter() - started)
+
+
+def serve_asgi(urls, concurrency, threads):
+    # A fresh event loop thread, like an ASGI server's: under async_to_sync
+    # every sync_to_async call would run on the calling (test) thread instead.
+    with ThreadPoolExecutor(max_workers=1) as loop_thread:
+        return loop_thread.submit(
+            asyncio.run, run_asgi(urls, concurrency, threads)
+        ).result()
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_compare_asgi_and_wsgi_reads(settings):
+    settings.STORE_METRICS_SAMPLE_RATE = 1
+    seeded = seed_store(scale=0.005)
+    product_ids = list(islice(cycle(seeded["product_ids"]), REQUESTS_PER_LEVEL))
+    cart_ids = list(islice(cycle(seeded["cart_ids"]), REQUESTS_PER_LEVEL))
+
+    paths = {
+        "product_detail": [f"products/{product_id}/" for product_id in product_ids],
+        "cart_read": [f"carts/{cart_id}/" for cart_id in cart_ids],
+    }
+    summaries, peaks = {}, {}
+    for name, suffixes in paths.items():
+        for concurrency in CONCURRENCY_LEVELS:
+            wsgi_threads, asgi_threads = PeakThreads(), PeakThreads()
+            wsgi = run_wsgi(
+                [f"/store/{suffix}" for suffix in suffixes], concurrency, wsgi_threads
+            )
+            asgi = serve_asgi(
+                [f"/store/async/{suffix}" for suffix in suffixes],
+                concurrency,
+                asgi_threads,
+            )
+            summaries[f"{name} wsgi x{concurrency}"] = wsgi.summary()
+            summaries[f"{name} asgi x{concurrency}"] = asgi.summary()
+            peaks[concurrency] = (wsgi_threads.peak, asgi_threads.peak)
+
+    print()
+    print(format_report(summaries))
+    for concurrency, (wsgi_peak, asgi_peak) in peaks.items():
+        print(f"x{concurrency}: peak threads wsgi {wsgi_peak}, asgi {asgi_peak}")
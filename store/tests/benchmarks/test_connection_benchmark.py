@@ -0,0 +1,66 @@
+"""
+Latency of a cheap catalogue request with a new database connection per
+request (CONN_MAX_AGE = 0) versus a persistent one (CONN_MAX_AGE = 60).
+
+    pytest -m benchmark store/tests/benchmarks/test_connection_benchmark.py -s
+
+Run it against the MySQL database from settings. The handshake it measures
+does not exist for in-memory SQLite, which Django never closes in tests.
+"""
+import statistics
+import time
+
+from django.core.cache import caches
+from django.db import close_old_connections, connection
+from model_bakery import baker
+import pytest
+
+from store.metrics import registry
+from store.models import Product
+
+REQUESTS = 200
+
+
+def timed_requests(client, url, max_age):
+    connection.close()
+    connection.settings_dict["CONN_MAX_AGE"] = max_age
+    registry.reset()
+    timings = []
+    for _ in range(REQUESTS):
+        for cache in caches.all():
+            cache.clear()
+        started = time.perf_counter()
+        # What the WSGI handler does around every request; the test client
+        # leaves it out.
+        close_old_connections()
+        assert client.get(url).status_code == 200
+        close_old_connections()
+        timings.append(time.perf_counter() - started)
+    opened = registry.counter_values().get("store_db_connections_opened_total", {})
+    return statistics.median(timings), opened.get(connection.alias, 0)
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_persistent_connections_skip_the_handshake(client):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("in-memory SQLite connections are never closed")
+    product = baker.make(Product)
+    url = f"/store/products/{product.id}/"
+    max_age = connection.settings_dict["CONN_MAX_AGE"]
+
+    try:
+        results = {age: timed_requests(client, url, age) for age in (0, 60)}
+    finally:
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+
+    print(f"\n{REQUESTS} requests to {url}")
+    for age, (median, opened) in results.items():
+        print(
+            f"CONN_MAX_AGE={age:>2}: median {median * 1000:.2f} ms, "
+            f"{opened} connections opened"
+        )
+    assert results[0][1] == REQUESTS
+    assert results[60][1] == 1
+    assert results[60][0] < results[0][0]
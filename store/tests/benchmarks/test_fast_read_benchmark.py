@@ -0,0 +1,50 @@
+import time
+
+from django.core.cache import caches
+from model_bakery import baker
+import pytest
+
+from store.models import Collection, Product, ProductImage, ProductReview
+
+
+def time_requests(client, url, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for cache in caches.all():
+            cache.clear()
+        assert client.get(url).status_code == 200
+    return (time.perf_counter() - started) / repeat
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_fast_product_list_is_faster_than_serializers(client, settings):
+    collection = baker.make(Collection)
+    products = baker.make(Product, collection=collection, _quantity=100)
+    ProductImage.objects.bulk_create(
+        [
+            ProductImage(product=product, image="store/images/a.jpg")
+            for product in products
+        ]
+    )
+    ProductReview.objects.bulk_create(
+        [
+            ProductReview(product=product, customer_name="Ada", description="Good")
+            for product in products
+            for _ in range(5)
+        ]
+    )
+    url = "/store/products/?page_size=100"
+
+    timings = {}
+    for fast in (False, True):
+        settings.STORE_FAST_READS = fast
+        time_requests(client, url, 2)
+        timings[fast] = time_requests(client, url, 10)
+
+    print(
+        f"\nproduct list, 100 rows: serializers {timings[False] * 1000:.1f} ms, "
+        f"fast read {timings[True] * 1000:.1f} ms "
+        f"({timings[False] / timings[True]:.1f}x)"
+    )
+    assert timings[True] < timings[False]
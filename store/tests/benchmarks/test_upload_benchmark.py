@@ -0,0 +1,84 @@
+"""
+Peak memory of parallel 2 MB image uploads through the streaming parser
+versus REST framework's default MultiPartParser, which keeps files under
+FILE_UPLOAD_MAX_MEMORY_SIZE (2.5 MB) in memory.
+
+    pytest -m benchmark store/tests/benchmarks/test_upload_benchmark.py -s
+
+Only parsing and storing the upload is measured, not the database write.
+Both figures include the test request bodies themselves (one copy per
+upload), which a real server would read from the socket instead.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import os
+import resource
+import tracemalloc
+
+from django.core.files.storage import default_storage
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+import pytest
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from store.uploads import ImageUploadParser
+
+PARALLEL_UPLOADS = 8
+
+
+class NamedBytes(BytesIO):
+    name = "photo.png"
+
+
+def noise_png(width=800, height=800):
+    image = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    buffer = BytesIO()
+    image.save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def upload(parser, body):
+    request = APIRequestFactory().generic(
+        "POST", "/store/products/1/images/", body, content_type=MULTIPART_CONTENT
+    )
+    image = Request(request, parsers=[parser]).data["image"]
+    name = default_storage.save(f"store/images/{image.name}", image)
+    image.close()
+    return name
+
+
+def peak_memory(parser, body):
+    tracemalloc.start()
+    try:
+        with ThreadPoolExecutor(max_workers=PARALLEL_UPLOADS) as executor:
+            names = list(
+                executor.map(lambda _: upload(parser, body), range(PARALLEL_UPLOADS))
+            )
+        return tracemalloc.get_traced_memory()[1], names
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark
+def test_streaming_upload_peak_memory(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    content = noise_png()
+    assert 1_900_000 < len(content) <= 2000 * 1024
+    body = encode_multipart(BOUNDARY, {"image": NamedBytes(content)})
+
+    peaks = {}
+    for label, parser in [
+        ("multipart (default)", MultiPartParser()),
+        ("streaming", ImageUploadParser()),
+    ]:
+        peaks[label], names = peak_memory(parser, body)
+        assert len(set(names)) == PARALLEL_UPLOADS
+
+    print(f"\n{PARALLEL_UPLOADS} parallel uploads of {len(content) / 1e6:.2f} MB")
+    for label, peak in peaks.items():
+        print(f"{label:>20}: peak traced memory {peak / 1e6:.1f} MB")
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"process peak RSS {max_rss_kb / 1e3:.0f} MB")
+    assert peaks["streaming"] < peaks["multipart (default)"]
@@ -1,7 +1,48 @@
 import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 
 
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix, tmp_path_factory
+):
+    # Django tests SQLite in memory, where threads share a single connection
+    # and its table locks; a file keeps the concurrency tests meaningful.
+    for alias, database in settings.DATABASES.items():
+        test = database.setdefault("TEST", {})
+        if (
+            database["ENGINE"] == "django.db.backends.sqlite3"
+            and not test.get("NAME")
+            and not test.get("MIRROR")
+        ):
+            test["NAME"] = str(tmp_path_factory.mktemp("db") / f"{alias}.sqlite3")
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+
+
 @pytest.fixture
 def client():
     return APIClient()
+
+
+@pytest.fixture
+def assert_constant_queries(client):
+    def assert_constant(url, make_rows, sizes=(1, 10)):
+        counts = []
+        for size in sizes:
+            make_rows(size)
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == 200
+            counts.append(len(context.captured_queries))
+        assert len(set(counts)) == 1, f"{url} query count grew with rows: {counts}"
+
+    return assert_constant
@@ -0,0 +1,176 @@
+import json
+import re
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from model_bakery import baker
+import pytest
+
+from store import inventory
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Product,
+    ProductImage,
+    ProductReview,
+)
+
+
+class BlockingAsyncClient:
+    """Drives django.test.AsyncClient from the synchronous tests."""
+
+    def __init__(self):
+        self.client = AsyncClient()
+
+    def get(self, *args, **kwargs):
+        return async_to_sync(self.client.get)(*args, **kwargs)
+
+    def post(self, *args, **kwargs):
+        return async_to_sync(self.client.post)(*args, **kwargs)
+
+
+@pytest.fixture
+def async_client():
+    return BlockingAsyncClient()
+
+
+@pytest.fixture
+def compare(client, async_client):
+    def compare(sync_url, async_url):
+        expected = client.get(sync_url)
+        response = async_client.get(async_url)
+        assert response.status_code == expected.status_code == 200
+        # Page links point at the async view; reviews_url stays on the
+        # regular review endpoint, which has no async counterpart.
+        assert response.content == re.sub(
+            rb"/store/(?!products/\d+/reviews/)", b"/store/async/", expected.content
+        )
+
+    return compare
+
+
+@pytest.fixture
+def catalogue():
+    collections = baker.make(Collection, _quantity=2)
+    for collection in collections:
+        for product in baker.make(Product, collection=collection, _quantity=3):
+            baker.make(ProductImage, product=product, _quantity=2)
+            baker.make(ProductReview, product=product, _quantity=2)
+    return collections
+
+
+@pytest.mark.django_db
+class TestAsyncReads:
+    def test_product_list_matches_sync_view(self, compare, catalogue):
+        compare("/store/products/?page_size=4", "/store/async/products/?page_size=4")
+
+    def test_product_list_follows_cursor(self, client, async_client, catalogue):
+        response = async_client.get("/store/async/products/?page_size=4")
+        first = json.loads(response.content)
+        second = json.loads(async_client.get(first["next"]).content)
+
+        assert [row["id"] for row in first["results"] + second["results"]] == [
+            row["id"] for row in client.get("/store/products/").data["results"]
+        ]
+
+    def test_product_list_filters_and_searches(self, compare, catalogue):
+        query = f"?collection_id={catalogue[0].id}&search=a"
+
+        compare(f"/store/products/{query}", f"/store/async/products/{query}")
+
+    def test_product_detail_matches_sync_view(self, compare, catalogue):
+        product_id = Product.objects.first().id
+
+        compare(
+            f"/store/products/{product_id}/", f"/store/async/products/{product_id}/"
+        )
+
+    def test_cart_detail_matches_sync_view(self, compare):
+        cart = baker.make(Cart, total_price=12, item_count=4)
+        baker.make(CartItem, cart=cart, quantity=2, _quantity=2)
+
+        compare(f"/store/carts/{cart.id}/", f"/store/async/carts/{cart.id}/")
+
+    def test_missing_rows_return_404(self, async_client):
+        assert async_client.get("/store/async/products/0/").status_code == 404
+        response = async_client.get("/store/async/carts/not-a-uuid/")
+        assert response.status_code == 404
+        assert json.loads(response.content) == {"detail": "Not found."}
+
+    def test_invalid_filter_returns_400(self, async_client):
+        response = async_client.get("/store/async/products/?min_price=cheap")
+
+        assert response.status_code == 400
+        assert json.loads(response.content) == {"min_price": "Enter a whole number."}
+
+
+@pytest.mark.django_db
+class TestAsyncAddCartItem:
+    def post(self, async_client, cart_id, data):
+        return async_client.post(
+            f"/store/async/carts/{cart_id}/items/",
+            json.dumps(data),
+            content_type="application/json",
+        )
+
+    def test_adds_item_and_updates_cart_totals(self, async_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=5, inventory=10)
+
+        first = self.post(
+            async_client, cart.id, {"product_id": product.id, "quantity": 2}
+        )
+        second = self.post(
+            async_client, cart.id, {"product_id": product.id, "quantity": 1}
+        )
+
+        assert first.status_code == second.status_code == 201
+        assert json.loads(second.content) == {
+            "id": json.loads(first.content)["id"],
+            "quantity": 3,
+            "product_id": product.id,
+        }
+        cart.refresh_from_db()
+        assert (cart.item_count, cart.total_price) == (3, 15)
+
+    def test_if_data_is_invalid_returns_400(self, async_client):
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        missing = self.post(async_client, cart.id, {"product_id": 0, "quantity": 1})
+        empty = self.post(
+            async_client, cart.id, {"product_id": product.id, "quantity": 0}
+        )
+
+        assert missing.status_code == empty.status_code == 400
+        assert json.loads(missing.content) == {
+            "product_id": ["No product with the given ID was found."]
+        }
+        assert "quantity" in json.loads(empty.content)
+
+    def test_if_cart_does_not_exist_returns_404(self, async_client):
+        product = baker.make(Product)
+
+        response = self.post(
+            async_client, "not-a-uuid", {"product_id": product.id, "quantity": 1}
+        )
+
+        assert response.status_code == 404
+
+    def test_if_stock_keeps_changing_returns_400(self, async_client, monkeypatch):
+        def claim_versions(versions, **updates):
+            raise inventory.StaleInventory()
+
+        monkeypatch.setattr(inventory, "claim_versions", claim_versions)
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=5, inventory=10)
+
+        response = self.post(
+            async_client, cart.id, {"product_id": product.id, "quantity": 1}
+        )
+
+        assert response.status_code == 400
+        assert json.loads(response.content) == {
+            "quantity": [inventory.CONFLICT_MESSAGE]
+        }
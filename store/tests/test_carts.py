@@ -0,0 +1,172 @@
+from datetime import timedelta
+from io import StringIO
+from threading import Thread
+
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from model_bakery import baker
+import pytest
+
+from store.models import Cart, CartItem, Product
+
+
+@pytest.mark.django_db
+class TestRetrieveCart:
+    def test_if_cart_exists_returns_200(self, client):
+        cart = baker.make(Cart)
+
+        response = client.get(f"/store/carts/{cart.id}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["id"] == str(cart.id)
+
+    def test_cart_query_count_is_constant(self, assert_constant_queries):
+        cart = baker.make(Cart)
+
+        assert_constant_queries(
+            f"/store/carts/{cart.id}/",
+            lambda size: baker.make(CartItem, cart=cart, quantity=1, _quantity=size),
+        )
+
+
+@pytest.mark.django_db
+class TestCartTotals:
+    def test_adding_items_updates_totals(self, client):
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=25, inventory=10)
+
+        client.post(
+            f"/store/carts/{cart.id}/items/", {"product_id": product.id, "quantity": 2}
+        )
+        client.post(
+            f"/store/carts/{cart.id}/items/", {"product_id": product.id, "quantity": 1}
+        )
+        response = client.get(f"/store/carts/{cart.id}/")
+
+        assert response.data["cart_total_price"] == 75
+        assert response.data["item_count"] == 3
+
+    def test_adding_unknown_product_returns_400(self, client):
+        cart = baker.make(Cart)
+
+        response = client.post(
+            f"/store/carts/{cart.id}/items/", {"product_id": 0, "quantity": 1}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_updating_and_deleting_items_updates_totals(self, client):
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=10, inventory=10)
+        response = client.post(
+            f"/store/carts/{cart.id}/items/", {"product_id": product.id, "quantity": 1}
+        )
+        item_url = f"/store/carts/{cart.id}/items/{response.data['id']}/"
+
+        client.patch(item_url, {"quantity": 4})
+        cart.refresh_from_db()
+        assert (cart.total_price, cart.item_count) == (40, 4)
+
+        client.delete(item_url)
+        cart.refresh_from_db()
+        assert (cart.total_price, cart.item_count) == (0, 0)
+
+    def test_price_change_refreshes_carts_holding_the_product(self):
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=10)
+        baker.make(CartItem, cart=cart, product=product, quantity=3)
+
+        product.price = 20
+        product.save()
+
+        cart.refresh_from_db()
+        assert cart.total_price == 60
+
+    def test_recalculate_command_repairs_drift(self):
+        cart = baker.make(Cart, total_price=999, item_count=99)
+        baker.make(CartItem, cart=cart, product__price=5, quantity=2)
+        empty_cart = baker.make(Cart, total_price=7, item_count=1)
+
+        call_command("recalculate_cart_totals")
+
+        cart.refresh_from_db()
+        empty_cart.refresh_from_db()
+        assert (cart.total_price, cart.item_count) == (10, 2)
+        assert (empty_cart.total_price, empty_cart.item_count) == (0, 0)
+
+
+@pytest.mark.django_db
+class TestPurgeCarts:
+    def make_carts(self, days_old, count):
+        carts = baker.make(Cart, _quantity=count)
+        created_at = timezone.now() - timedelta(days=days_old)
+        Cart.objects.filter(pk__in=[cart.pk for cart in carts]).update(
+            created_at=created_at
+        )
+        for cart in carts:
+            baker.make(CartItem, cart=cart, quantity=1)
+        return carts
+
+    def test_deletes_only_stale_carts_in_chunks(self):
+        self.make_carts(days_old=40, count=7)
+        fresh = self.make_carts(days_old=1, count=2)
+        out = StringIO()
+
+        call_command("purge_carts", days=30, chunk_size=3, pause=0, stdout=out)
+
+        assert "Deleted 7 carts" in out.getvalue()
+        assert set(Cart.objects.values_list("pk", flat=True)) == {
+            cart.pk for cart in fresh
+        }
+        assert CartItem.objects.count() == 2
+
+    def test_dry_run_deletes_nothing(self):
+        self.make_carts(days_old=40, count=3)
+        out = StringIO()
+
+        call_command("purge_carts", days=30, dry_run=True, stdout=out)
+
+        assert "Would delete 3 carts" in out.getvalue()
+        assert Cart.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentAddCartItem:
+    def test_concurrent_adds_lose_no_increments(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            pytest.skip("in-memory SQLite locks whole tables across threads")
+        cart = baker.make(Cart)
+        product = baker.make(Product, price=2, inventory=100)
+        threads, adds_per_thread = 8, 10
+        errors = []
+
+        def add_items():
+            client = APIClient()
+            try:
+                for _ in range(adds_per_thread):
+                    response = client.post(
+                        f"/store/carts/{cart.id}/items/",
+                        {"product_id": product.id, "quantity": 1},
+                    )
+                    if response.status_code != status.HTTP_201_CREATED:
+                        errors.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [Thread(target=add_items) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert errors == []
+        item = CartItem.objects.get(cart=cart, product=product)
+        assert item.quantity == threads * adds_per_thread
+        cart.refresh_from_db()
+        assert cart.item_count == threads * adds_per_thread
+        assert cart.total_price == threads * adds_per_thread * 2
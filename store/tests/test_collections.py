@@ -1,8 +1,14 @@
+from io import StringIO
+
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from model_bakery import baker
 import pytest
 
+from store.models import Collection, Product
+
 
 @pytest.mark.django_db
 class TestCreateCollection:
@@ -31,3 +37,31 @@ class TestRetrieveCollection:
     def test_if_user_is_anonymous_returns_200(self, client):
         response = client.get("/store/collections/")
         assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestCollectionProductCount:
+    def test_count_follows_product_create_move_and_delete(self, client):
+        first, second = baker.make(Collection, _quantity=2)
+        products = baker.make(Product, collection=first, _quantity=3)
+
+        products[0].collection = second
+        products[0].save()
+        products[1].delete()
+
+        response = client.get("/store/collections/")
+        counts = {item["id"]: item["product_count"] for item in response.data}
+        assert counts == {first.id: 1, second.id: 1}
+
+    def test_recount_command_repairs_drift(self, client):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.update(product_count=40)
+        url = f"/store/collections/{collection.id}/"
+        client.get(url)
+
+        call_command("recount_collection_products", stdout=StringIO())
+
+        collection.refresh_from_db()
+        assert collection.product_count == 2
+        assert client.get(url).data["product_count"] == 2
@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+
+from django.db import OperationalError
+import pytest
+
+from store.pool import ConnectionPool
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+def ping(connection):
+    connection.execute("SELECT 1")
+
+
+class TestConnectionPool:
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2, check=ping)
+
+        first, reused = pool.acquire(connect)
+        pool.release(first)
+        again, reused_again = pool.acquire(connect)
+
+        assert (reused, reused_again) == (False, True)
+        assert again is first
+        assert pool.size == 1
+
+    def test_waits_for_a_release_when_full(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        held, _ = pool.acquire(connect)
+        threading.Timer(0.05, pool.release, [held]).start()
+
+        connection, reused = pool.acquire(connect)
+
+        assert connection is held and reused
+
+    def test_raises_when_no_connection_frees_up_in_time(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        pool.acquire(connect)
+
+        with pytest.raises(OperationalError):
+            pool.acquire(connect)
+
+    def test_broken_connections_are_replaced(self):
+        pool = ConnectionPool(max_size=1, check=ping)
+        broken, _ = pool.acquire(connect)
+        broken.close()
+        pool.release(broken)
+
+        connection, reused = pool.acquire(connect)
+
+        assert connection is not broken and not reused
+        assert pool.size == 1
+
+    def test_connections_idle_too_long_are_replaced(self):
+        pool = ConnectionPool(max_size=1, max_idle=0)
+        stale, _ = pool.acquire(connect)
+        pool.release(stale)
+
+        connection, reused = pool.acquire(connect)
+
+        assert connection is not stale and not reused
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+
+        def refuse():
+            raise OperationalError("refused")
+
+        with pytest.raises(OperationalError):
+            pool.acquire(refuse)
+        assert pool.size == 0
+        assert pool.acquire(connect)[1] is False
@@ -0,0 +1,84 @@
+from django.core.cache import caches
+from model_bakery import baker
+import pytest
+
+from store.models import (
+    Cart,
+    CartItem,
+    Collection,
+    Order,
+    Product,
+    ProductImage,
+    ProductReview,
+)
+from user.models import User
+
+
+@pytest.fixture
+def compare(client, settings):
+    def compare(url):
+        responses = []
+        for fast in (False, True):
+            settings.STORE_FAST_READS = fast
+            for cache in caches.all():
+                cache.clear()
+            response = client.get(url)
+            assert response.status_code == 200
+            responses.append(response.content)
+        slow, fast = responses
+        assert fast == slow
+
+    return compare
+
+
+@pytest.fixture
+def catalogue():
+    collections = baker.make(Collection, _quantity=2)
+    for collection in collections:
+        for product in baker.make(Product, collection=collection, _quantity=3):
+            baker.make(ProductImage, product=product, _quantity=2)
+            baker.make(ProductReview, product=product, _quantity=4)
+    return collections
+
+
+@pytest.mark.django_db
+class TestFastReadsMatchSerializers:
+    def test_product_list(self, compare, catalogue):
+        compare("/store/products/")
+
+    def test_product_list_second_page(self, compare, client, catalogue):
+        compare(client.get("/store/products/?page_size=2").data["next"])
+
+    def test_product_search_and_facets(self, compare, catalogue):
+        compare("/store/products/?search=a&facets=true")
+
+    def test_product_list_embedding_every_review(self, compare, catalogue, settings):
+        settings.STORE_EMBEDDED_REVIEWS = None
+        compare("/store/products/")
+
+    def test_product_detail(self, compare, catalogue):
+        compare(f"/store/products/{Product.objects.first().id}/")
+
+    def test_collection_list_and_detail(self, compare, catalogue):
+        compare("/store/collections/")
+        compare(f"/store/collections/{catalogue[0].id}/")
+
+    def test_cart_detail(self, compare):
+        cart = baker.make(Cart, total_price=12, item_count=4)
+        baker.make(CartItem, cart=cart, quantity=2, _quantity=2)
+
+        compare(f"/store/carts/{cart.id}/")
+
+    def test_order_list_and_detail(self, compare, client):
+        user = baker.make(User, is_staff=True)
+        orders = baker.make(Order, customer=user.customer, _quantity=3)
+        client.force_authenticate(user=user)
+
+        compare("/store/orders/")
+        compare(f"/store/orders/{orders[0].id}/")
+
+    def test_missing_detail_returns_404(self, client, settings):
+        settings.STORE_FAST_READS = True
+
+        assert client.get("/store/products/0/").status_code == 404
+        assert client.get("/store/carts/not-a-uuid/").status_code == 404
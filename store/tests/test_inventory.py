@@ -0,0 +1,400 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+import pytest
+
+from store import inventory
+from store.models import Cart, CartItem, InventoryReservation, Product
+from store.serializers import (
+    CreateOrderSerializer,
+    PatchProductSerializer,
+    ProductSerializer,
+    UpdateCartItemSerializer,
+)
+from user.models import User
+
+
+def add(client, cart, product, quantity):
+    return client.post(
+        f"/store/carts/{cart.id}/items/",
+        {"product_id": product.id, "quantity": quantity},
+    )
+
+
+def held(product):
+    return inventory.active_reservations([product.id]).get(product.id, 0)
+
+
+@pytest.fixture
+def product():
+    return baker.make(Product, price=5, inventory=5)
+
+
+@pytest.mark.django_db
+class TestReservations:
+    def test_adding_to_cart_reserves_stock(self, client, product):
+        add(client, baker.make(Cart), product, 2)
+        add(client, baker.make(Cart), product, 2)
+
+        response = add(client, baker.make(Cart), product, 2)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Not enough inventory" in response.data["quantity"][0]
+        assert held(product) == 4
+        assert CartItem.objects.count() == 2
+
+    def test_expired_reservations_stop_holding_stock(self, client, product):
+        add(client, baker.make(Cart), product, 5)
+        InventoryReservation.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = add(client, baker.make(Cart), product, 5)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert held(product) == 5
+
+    def test_adding_to_an_expired_reservation_does_not_revive_it(self, client):
+        product = baker.make(Product, price=5, inventory=10)
+        first, second = baker.make(Cart), baker.make(Cart)
+        add(client, first, product, 8)
+        InventoryReservation.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        add(client, second, product, 8)
+
+        response = add(client, first, product, 1)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert held(product) == 9
+        assert InventoryReservation.objects.get(cart=first).quantity == 1
+
+    def test_changing_quantity_adjusts_the_reservation(self, client, product):
+        cart = baker.make(Cart)
+        item_id = add(client, cart, product, 2).data["id"]
+        item_url = f"/store/carts/{cart.id}/items/{item_id}/"
+
+        too_many = client.patch(item_url, {"quantity": 6})
+        assert too_many.status_code == status.HTTP_400_BAD_REQUEST
+        assert held(product) == 2
+
+        client.patch(item_url, {"quantity": 1})
+        assert held(product) == 1
+
+        client.delete(item_url)
+        assert held(product) == 0
+
+    def test_quantity_changed_meanwhile_is_updated_from_its_new_value(
+        self, client, product
+    ):
+        cart = baker.make(Cart)
+        item_id = add(client, cart, product, 2).data["id"]
+        loaded = CartItem.objects.get(pk=item_id)
+        add(client, cart, product, 2)
+        serializer = UpdateCartItemSerializer(loaded, data={"quantity": 1})
+        serializer.is_valid(raise_exception=True)
+
+        serializer.save()
+
+        assert CartItem.objects.get(pk=item_id).quantity == 1
+        assert held(product) == 1
+        cart.refresh_from_db()
+        assert (cart.item_count, cart.total_price) == (1, 5)
+
+    def test_stale_version_is_retried(self, product, monkeypatch):
+        cart = baker.make(Cart)
+        check_stock = inventory.check_stock
+        calls = []
+
+        def check_then_race(*args, **kwargs):
+            versions = check_stock(*args, **kwargs)
+            if not calls:
+                # Another writer claims the product between our read and write.
+                inventory.claim_versions(dict(versions))
+            calls.append(versions)
+            return versions
+
+        monkeypatch.setattr(inventory, "check_stock", check_then_race)
+
+        inventory.retry_on_conflict(inventory.reserve, cart.id, product.id, 1)
+
+        assert len(calls) == 2
+        assert held(product) == 1
+
+    def test_purge_removes_expired_and_purged_carts_reservations(
+        self, client, product
+    ):
+        stale_cart, live_cart = baker.make(Cart), baker.make(Cart)
+        add(client, stale_cart, product, 1)
+        add(client, live_cart, product, 1)
+        Cart.objects.filter(pk=stale_cart.pk).update(
+            created_at=timezone.now() - timedelta(days=40)
+        )
+        expired = baker.make(Cart)
+        add(client, expired, product, 1)
+        InventoryReservation.objects.filter(cart=expired).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        out = StringIO()
+
+        call_command("purge_carts", days=30, pause=0, stdout=out)
+
+        assert "Deleted 1 carts" in out.getvalue()
+        assert "1 expired reservations" in out.getvalue()
+        assert list(InventoryReservation.objects.values_list("cart", flat=True)) == [
+            live_cart.pk
+        ]
+
+    def test_purge_deletes_expired_reservations_in_chunks(self, client, product):
+        for _ in range(3):
+            add(client, baker.make(Cart), product, 1)
+        InventoryReservation.objects.update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        call_command("purge_carts", dry_run=True, stdout=StringIO())
+        assert InventoryReservation.objects.count() == 3
+
+        with CaptureQueriesContext(connection) as context:
+            call_command("purge_carts", chunk_size=2, pause=0, stdout=StringIO())
+
+        deletes = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith("DELETE")
+            and "store_inventoryreservation" in query["sql"]
+        ]
+        assert len(deletes) == 2
+        assert not InventoryReservation.objects.exists()
+
+
+@pytest.mark.django_db
+class TestPersistentConflicts:
+    @pytest.fixture
+    def always_stale(self, monkeypatch):
+        def always_stale():
+            def claim_versions(versions, **updates):
+                raise inventory.StaleInventory()
+
+            monkeypatch.setattr(inventory, "claim_versions", claim_versions)
+
+        return always_stale
+
+    def test_add_that_keeps_conflicting_returns_400(
+        self, client, product, always_stale
+    ):
+        always_stale()
+
+        response = add(client, baker.make(Cart), product, 1)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["quantity"] == [inventory.CONFLICT_MESSAGE]
+        assert not CartItem.objects.exists()
+
+    def test_conflicting_attempts_back_off(self, product, always_stale, monkeypatch):
+        delays = []
+        monkeypatch.setattr(inventory.time, "sleep", delays.append)
+        always_stale()
+
+        with pytest.raises(inventory.StaleInventory):
+            inventory.retry_on_conflict(
+                inventory.reserve, baker.make(Cart).id, product.id, 1
+            )
+
+        assert len(delays) == inventory.CONFLICT_ATTEMPTS - 1
+        for attempt, delay in enumerate(delays):
+            assert 0 <= delay <= inventory.CONFLICT_BACKOFF * 2**attempt
+
+    def test_update_that_keeps_conflicting_returns_400(
+        self, client, product, always_stale
+    ):
+        cart = baker.make(Cart)
+        item_id = add(client, cart, product, 1).data["id"]
+        always_stale()
+
+        response = client.patch(
+            f"/store/carts/{cart.id}/items/{item_id}/", {"quantity": 3}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["quantity"] == [inventory.CONFLICT_MESSAGE]
+        assert CartItem.objects.get().quantity == 1
+
+
+@pytest.mark.django_db
+class TestCheckoutReservations:
+    @pytest.fixture
+    def buyer(self, client):
+        user = baker.make(User)
+        client.force_authenticate(user=user)
+        return user
+
+    def test_checkout_uses_the_carts_own_reservation(self, client, buyer, product):
+        cart, other = baker.make(Cart), baker.make(Cart)
+        add(client, cart, product, 3)
+        add(client, other, product, 2)
+
+        response = client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert product.inventory == 2
+        assert product.inventory_version == 3
+        assert list(InventoryReservation.objects.values_list("cart", flat=True)) == [
+            other.pk
+        ]
+
+    def test_checkout_refreshes_the_cached_catalogue(
+        self, client, buyer, product, django_capture_on_commit_callbacks
+    ):
+        cart = baker.make(Cart)
+        add(client, cart, product, 3)
+        url = f"/store/products/{product.id}/"
+        APIClient().get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert APIClient().get(url).data["inventory"] == 2
+
+    def test_checkout_of_a_cart_emptied_after_validation_returns_400(
+        self, client, buyer, product
+    ):
+        cart = baker.make(Cart)
+        add(client, cart, product, 1)
+        serializer = CreateOrderSerializer(
+            data={"cart_id": str(cart.id)}, context={"user_id": buyer.id}
+        )
+        serializer.is_valid(raise_exception=True)
+        # The first of two identical submissions already checked the cart out.
+        CartItem.objects.filter(cart=cart).delete()
+
+        with CaptureQueriesContext(connection) as context:
+            with pytest.raises(ValidationError) as error:
+                serializer.save()
+
+        assert error.value.detail == {"cart_id": ["The cart is empty."]}
+        assert not any(
+            query["sql"].startswith("UPDATE") for query in context.captured_queries
+        )
+        product.refresh_from_db()
+        assert product.inventory_version == 1
+
+    def test_checkout_cannot_take_stock_reserved_by_other_carts(
+        self, client, buyer, product
+    ):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+        add(client, baker.make(Cart), product, 4)
+
+        response = client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Not enough inventory" in response.data["cart_id"][0]
+        product.refresh_from_db()
+        assert product.inventory == 5
+
+
+@pytest.mark.django_db
+class TestAdminInventoryEdits:
+    def post_change(self, client, product, inventory, version):
+        client.force_login(baker.make(User, is_staff=True, is_superuser=True))
+        return client.post(
+            f"/admin/store/product/{product.id}/change/",
+            {
+                "title": product.title,
+                "description": product.description,
+                "price": product.price,
+                "inventory_0": inventory,
+                "inventory_1": version,
+                "collection": product.collection_id,
+                "manufacturer": product.manufacturer,
+                "images-TOTAL_FORMS": 0,
+                "images-INITIAL_FORMS": 0,
+            },
+        )
+
+    def test_edit_based_on_current_version_is_saved(self, client, product):
+        response = self.post_change(client, product, 9, product.inventory_version)
+
+        assert response.status_code == 302
+        product.refresh_from_db()
+        assert (product.inventory, product.inventory_version) == (9, 1)
+
+    def test_saved_edit_refreshes_the_cached_catalogue(self, client, product):
+        url = f"/store/products/{product.id}/"
+        APIClient().get(url)
+
+        self.post_change(client, product, 9, product.inventory_version)
+
+        assert APIClient().get(url).data["inventory"] == 9
+
+    def test_edit_based_on_stale_version_is_rejected(self, client, product):
+        Product.objects.filter(pk=product.pk).update(inventory=3, inventory_version=7)
+
+        self.post_change(client, product, 9, 0)
+
+        product.refresh_from_db()
+        assert (product.inventory, product.inventory_version) == (3, 7)
+
+
+@pytest.mark.django_db
+class TestApiInventoryEdits:
+    @pytest.fixture
+    def admin(self, client):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+    def test_patch_leaves_inventory_changed_meanwhile(self, product):
+        loaded = Product.objects.get(pk=product.pk)
+        Product.objects.filter(pk=product.pk).update(inventory=3, inventory_version=7)
+        serializer = PatchProductSerializer(loaded, data={"in_cart": True})
+        serializer.is_valid(raise_exception=True)
+
+        serializer.save()
+
+        product.refresh_from_db()
+        assert product.in_cart
+        assert (product.inventory, product.inventory_version) == (3, 7)
+
+    def test_put_writes_inventory_through_the_version_check(
+        self, client, admin, product
+    ):
+        response = client.put(
+            f"/store/products/{product.id}/",
+            {
+                "title": "Renamed",
+                "description": product.description,
+                "price": product.price,
+                "inventory": 9,
+                "collection": product.collection_id,
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert (product.title, product.inventory) == ("Renamed", 9)
+        assert product.inventory_version == 1
+
+    def test_put_based_on_stale_inventory_is_rejected(self, product):
+        loaded = Product.objects.get(pk=product.pk)
+        Product.objects.filter(pk=product.pk).update(inventory=3, inventory_version=7)
+        serializer = ProductSerializer(
+            loaded, data={"inventory": 9, "title": "Renamed"}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with pytest.raises(ValidationError) as error:
+            serializer.save()
+
+        assert error.value.detail == {"inventory": [inventory.CONFLICT_MESSAGE]}
+        product.refresh_from_db()
+        assert product.title != "Renamed"
+        assert (product.inventory, product.inventory_version) == (3, 7)
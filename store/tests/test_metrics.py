@@ -0,0 +1,91 @@
+import re
+import time
+
+from django.db import connections
+from model_bakery import baker
+import pytest
+
+from store.metrics import registry
+from store.models import Product
+from store.serializers import ProductSerializer
+from user.models import User
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    registry.reset()
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    def test_sampled_requests_carry_server_timing(self, client):
+        response = client.get("/store/products/")
+
+        assert response["Server-Timing"].startswith('db;desc="')
+        assert "total;dur=" in response["Server-Timing"]
+
+    def test_serializer_time_is_reported_apart_from_rendering(
+        self, client, monkeypatch
+    ):
+        baker.make(Product)
+        to_representation = ProductSerializer.to_representation
+
+        def slow_to_representation(self, instance):
+            time.sleep(0.02)
+            return to_representation(self, instance)
+
+        monkeypatch.setattr(
+            ProductSerializer, "to_representation", slow_to_representation
+        )
+
+        response = client.get("/store/products/")
+
+        entry = r'(\w+);(?:desc="[^"]*";)?dur=([\d.]+)'
+        timings = dict(re.findall(entry, response["Server-Timing"]))
+        assert float(timings["serialize"]) >= 20
+        assert float(timings["render"]) < 20
+        histogram = registry.snapshot()["store_serialize_duration_seconds"]
+        assert histogram["products-list"].sum >= 0.02
+
+    def test_unsampled_requests_are_not_timed(self, client, settings):
+        settings.STORE_METRICS_SAMPLE_RATE = 0
+
+        response = client.get("/store/products/")
+
+        assert "Server-Timing" not in response
+        assert registry.snapshot() == {}
+
+    def test_metrics_endpoint_requires_admin(self, client):
+        client.force_authenticate(user=baker.make(User))
+
+        response = client.get("/store/metrics/")
+
+        assert response.status_code == 403
+
+    def test_metrics_endpoint_exports_prometheus_histograms(self, client):
+        client.get("/store/products/")
+        client.get("/store/products/")
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.get("/store/metrics/")
+
+        body = response.content.decode()
+        assert response["Content-Type"].startswith("text/plain")
+        assert "# TYPE store_request_duration_seconds histogram" in body
+        assert (
+            'store_request_duration_seconds_bucket{view="products-list",le="+Inf"} 2'
+            in body
+        )
+        assert 'store_db_queries_count{view="products-list"} 2' in body
+
+    def test_metrics_endpoint_counts_database_connections(self, client):
+        connection = connections.create_connection("default")
+        connection.ensure_connection()
+        connection.close()
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.get("/store/metrics/")
+
+        body = response.content.decode()
+        assert "# TYPE store_db_connections_opened_total counter" in body
+        assert 'store_db_connections_opened_total{alias="default"} 1' in body
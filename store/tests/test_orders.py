@@ -0,0 +1,161 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+from store import exports
+from store.models import Cart, CartItem, Order, OrderItem, Product
+from user.models import User
+
+
+@pytest.fixture
+def user():
+    return baker.make(User)
+
+
+def count_queries(context):
+    # Backends with a limit on query parameters (SQLite) split bulk_create into
+    # several INSERTs; count the order item insert once so results compare
+    # across backends.
+    queries = [query["sql"] for query in context.captured_queries]
+    inserts = [sql for sql in queries if "INSERT INTO" in sql and "orderitem" in sql]
+    return len(queries) - len(inserts) + min(len(inserts), 1)
+
+
+def make_cart(size, inventory=10):
+    cart = baker.make(Cart)
+    for product in baker.make(Product, price=3, inventory=inventory, _quantity=size):
+        baker.make(CartItem, cart=cart, product=product, quantity=2)
+    return cart
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_if_user_is_anonymous_returns_401(self, client):
+        response = client.post("/store/orders/", {"cart_id": str(make_cart(1).id)})
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_checkout_creates_order_items_and_decrements_inventory(
+        self, client, user
+    ):
+        cart = make_cart(3)
+        client.force_authenticate(user=user)
+
+        response = client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_200_OK
+        items = OrderItem.objects.filter(order_id=response.data["id"])
+        assert [(item.quantity, item.unit_price) for item in items] == [(2, 3)] * 3
+        assert set(Product.objects.values_list("inventory", flat=True)) == {8}
+        assert not Cart.objects.filter(pk=cart.id).exists()
+
+    def test_if_inventory_is_short_returns_400_and_changes_nothing(
+        self, client, user
+    ):
+        cart = make_cart(2, inventory=1)
+        client.force_authenticate(user=user)
+
+        response = client.post("/store/orders/", {"cart_id": str(cart.id)})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Not enough inventory" in response.data["cart_id"][0]
+        assert not Order.objects.exists()
+        assert set(Product.objects.values_list("inventory", flat=True)) == {1}
+        assert Cart.objects.filter(pk=cart.id).exists()
+
+    def test_if_cart_is_empty_returns_400(self, client, user):
+        client.force_authenticate(user=user)
+
+        response = client.post("/store/orders/", {"cart_id": str(baker.make(Cart).id)})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_checkout_query_count_is_constant_for_1_to_500_items(self, client, user):
+        client.force_authenticate(user=user)
+        counts = []
+        for size in (1, 50, 500):
+            cart = make_cart(size)
+            with CaptureQueriesContext(connection) as context:
+                response = client.post("/store/orders/", {"cart_id": str(cart.id)})
+            assert response.status_code == status.HTTP_200_OK
+            counts.append(count_queries(context))
+
+        assert len(set(counts)) == 1, counts
+
+
+@pytest.mark.django_db
+class TestExportOrders:
+    @pytest.fixture
+    def orders(self, user):
+        complete = baker.make(
+            Order, customer=user.customer, payment_status=Order.PAYMENT_STATUS_COMPLETE
+        )
+        pending = baker.make(Order, customer=user.customer)
+        baker.make(OrderItem, order=complete, quantity=2, unit_price=5, _quantity=3)
+        baker.make(OrderItem, order=pending, quantity=1, unit_price=5)
+        return complete, pending
+
+    def test_if_user_is_not_admin_returns_403(self, client, user):
+        client.force_authenticate(user=user)
+
+        response = client.get("/store/orders/export/")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_streams_orders_as_csv(self, client, orders):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.get("/store/orders/export/")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert response["Content-Type"] == "text/csv"
+        assert lines[0].startswith("id,placed_at,payment_status,customer_id")
+        assert len(lines) == 3
+
+    def test_streams_filtered_order_items_as_ndjson(self, client, orders):
+        complete, _ = orders
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.get(
+            "/store/orders/export/items/",
+            {"output": "ndjson", "payment_status": Order.PAYMENT_STATUS_COMPLETE},
+        )
+
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        assert {row["order_id"] for row in rows} == {complete.id}
+        assert len(rows) == 3
+
+    def test_export_reads_in_keyset_chunks(self, client, user, monkeypatch):
+        monkeypatch.setattr(exports, "EXPORT_CHUNK_SIZE", 2)
+        placed_at = timezone.now()
+        orders = baker.make(Order, customer=user.customer, _quantity=5)
+        Order.objects.update(placed_at=placed_at)
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get("/store/orders/export/")
+            lines = b"".join(response.streaming_content).decode().splitlines()
+
+        ids = [int(line.split(",")[0]) for line in lines[1:]]
+        assert ids == sorted(order.id for order in orders)
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if "store_order" in query["sql"] and "LIMIT 2" in query["sql"]
+        ]
+        assert len(selects) == 3
+
+    def test_if_date_filter_is_invalid_returns_400(self, client, orders):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.get("/store/orders/export/", {"placed_after": "yesterday"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,185 @@
+from io import BytesIO
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from model_bakery import baker
+from PIL import Image
+import pytest
+
+from store import uploads
+from store.models import Product, ProductImage
+from store.validators import FILE_SIZE_MESSAGE
+from user.models import User
+
+
+def make_upload(width, height=None, name="photo.png"):
+    buffer = BytesIO()
+    Image.new("RGBA", (width, height or width), (200, 30, 30, 255)).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.STORE_IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+    settings.STORE_IMAGE_VARIANTS_EAGER = True
+    return tmp_path
+
+
+@pytest.fixture
+def upload(client, django_capture_on_commit_callbacks):
+    def upload(product, file):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(
+                f"/store/products/{product.id}/images/",
+                {"image": file},
+                format="multipart",
+            )
+        client.force_authenticate(user=None)
+        assert response.status_code == 201
+        return ProductImage.objects.get(pk=response.data["id"])
+
+    return upload
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    def test_upload_generates_smaller_variants_in_each_format(
+        self, media, upload
+    ):
+        image = upload(baker.make(Product), make_upload(800, 400))
+
+        assert [(v["format"], v["width"]) for v in image.variants] == [
+            (variant_format, width)
+            for width in (160, 320, 640)
+            for variant_format in ("webp", "jpeg")
+        ]
+        for variant in image.variants:
+            with Image.open(media / variant["name"]) as resized:
+                assert resized.size == (variant["width"], variant["width"] // 2)
+                assert resized.format == variant["format"].upper()
+            assert variant["name"].startswith("store/images/photo")
+
+    def test_small_image_gets_one_variant_at_its_own_width(self, media, upload):
+        image = upload(baker.make(Product), make_upload(100))
+
+        assert {variant["width"] for variant in image.variants} == {100}
+
+    def test_serializer_returns_variant_urls_and_srcset(
+        self, media, upload, client
+    ):
+        product = baker.make(Product)
+        upload(product, make_upload(400))
+
+        response = client.get(f"/store/products/{product.id}/")
+
+        image = response.data["images"][0]
+        assert [(v["format"], v["width"]) for v in image["variants"]] == [
+            ("jpeg", 160),
+            ("jpeg", 320),
+            ("webp", 160),
+            ("webp", 320),
+        ]
+        assert image["variants"][0]["url"].startswith("http://testserver/media/")
+        assert image["srcset"]["webp"] == ", ".join(
+            f"{v['url']} {v['width']}w" for v in image["variants"][2:]
+        )
+
+    def test_fast_read_matches_serializer(self, media, upload, client, settings):
+        product = baker.make(Product)
+        upload(product, make_upload(400))
+
+        responses = []
+        for fast in (False, True):
+            settings.STORE_FAST_READS = fast
+            for cache in caches.all():
+                cache.clear()
+            responses.append(client.get(f"/store/products/{product.id}/").content)
+
+        assert responses[0] == responses[1]
+
+    def test_deleting_image_removes_variant_files(
+        self, media, upload, client, django_capture_on_commit_callbacks
+    ):
+        product = baker.make(Product)
+        image = upload(product, make_upload(400))
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.delete(f"/store/products/{product.id}/images/{image.id}/")
+
+        assert response.status_code == 204
+        assert not any((media / variant["name"]).exists() for variant in image.variants)
+
+    def test_backfill_command_fills_missing_variants(self, media, upload):
+        product = baker.make(Product)
+        image = upload(product, make_upload(400))
+        ProductImage.objects.filter(pk=image.pk).update(variants=[])
+        done = upload(product, make_upload(200))
+
+        call_command("generate_image_variants", "--missing", "--workers=1")
+
+        image.refresh_from_db()
+        assert len(image.variants) == 4
+        assert ProductImage.objects.get(pk=done.pk).variants == done.variants
+
+
+@pytest.mark.django_db
+class TestStreamingUpload:
+    @pytest.fixture
+    def admin_client(self, client, media):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+        return client
+
+    def post(self, client, product, file):
+        return client.post(
+            f"/store/products/{product.id}/images/", {"image": file}, format="multipart"
+        )
+
+    def test_if_content_is_not_an_image_returns_400(self, admin_client, media):
+        product = baker.make(Product)
+        fake = SimpleUploadedFile("photo.png", b"#!/bin/sh\necho hi\n" * 100)
+
+        response = self.post(admin_client, product, fake)
+
+        assert response.status_code == 400
+        assert "valid image" in response.data["image"][0]
+        assert not ProductImage.objects.exists()
+        assert not (media / "store").exists()
+
+    def test_if_file_is_too_large_returns_400_before_reading_it(self, admin_client):
+        big = SimpleUploadedFile("photo.png", b"\x89PNG\r\n\x1a\n" + b"0" * 2_200_000)
+
+        response = self.post(admin_client, baker.make(Product), big)
+
+        assert response.status_code == 400
+        assert response.data["image"] == [FILE_SIZE_MESSAGE]
+
+    def test_size_limit_is_enforced_while_streaming(self, admin_client, monkeypatch):
+        # Lift the Content-Length check so the handler has to stop the stream.
+        monkeypatch.setattr(uploads, "MULTIPART_OVERHEAD", 10_000_000)
+        received = []
+        receive = uploads.ImageUploadHandler.receive_data_chunk
+
+        def spy(handler, raw_data, start):
+            received.append(start + len(raw_data))
+            return receive(handler, raw_data, start)
+
+        monkeypatch.setattr(uploads.ImageUploadHandler, "receive_data_chunk", spy)
+        big = SimpleUploadedFile("photo.png", b"\x89PNG\r\n\x1a\n" + b"0" * 3_000_000)
+
+        response = self.post(admin_client, baker.make(Product), big)
+
+        assert response.status_code == 400
+        assert response.data["image"] == [FILE_SIZE_MESSAGE]
+        assert max(received) <= uploads.MAX_UPLOAD_SIZE + 64 * 1024
+
+    def test_valid_image_is_streamed_to_storage(self, admin_client, media):
+        response = self.post(admin_client, baker.make(Product), make_upload(50))
+
+        assert response.status_code == 201
+        image = ProductImage.objects.get()
+        with Image.open(media / image.image.name) as stored:
+            assert stored.size == (50, 50)
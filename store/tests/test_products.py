@@ -0,0 +1,435 @@
+from base64 import b64encode
+import json
+from io import StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from model_bakery import baker
+import pytest
+
+from store import search
+from store.management.commands import rebuild_search_index
+from store.models import (
+    Collection,
+    Product,
+    ProductImage,
+    ProductReview,
+    ProductSearchToken,
+)
+from user.models import User
+
+
+@pytest.fixture
+def products():
+    collection = baker.make(Collection)
+    return [
+        baker.make(Product, title=f"Product {index:02}", collection=collection)
+        for index in range(30)
+    ]
+
+
+@pytest.mark.django_db
+class TestListProducts:
+    def test_first_page_is_limited_to_page_size(self, client, products):
+        response = client.get("/store/products/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 24
+        assert response.data["previous"] is None
+        assert response.data["next"] is not None
+
+    def test_following_next_links_walks_every_product_in_title_order(
+        self, client, products
+    ):
+        titles = []
+        url = "/store/products/?page_size=7"
+        while url:
+            response = client.get(url)
+            titles += [product["title"] for product in response.data["results"]]
+            url = response.data["next"]
+
+        assert titles == sorted(product.title for product in products)
+
+    def test_previous_link_returns_the_page_before(self, client, products):
+        first = client.get("/store/products/?page_size=10")
+        second = client.get(first.data["next"])
+        back = client.get(second.data["previous"])
+
+        assert back.data["results"] == first.data["results"]
+        assert back.data["previous"] is None
+
+    def test_duplicate_titles_are_not_skipped(self, client):
+        collection = baker.make(Collection)
+        baker.make(Product, title="Same", collection=collection, _quantity=5)
+
+        first = client.get("/store/products/?page_size=2")
+        second = client.get(first.data["next"])
+        third = client.get(second.data["next"])
+
+        ids = [
+            product["id"]
+            for page in (first, second, third)
+            for product in page.data["results"]
+        ]
+        assert len(set(ids)) == 5
+        assert third.data["next"] is None
+
+    def test_invalid_cursor_returns_404(self, client, products):
+        response = client.get("/store/products/?cursor=garbage")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestProductQueries:
+    def make_products(self, collection):
+        def make(size):
+            for product in baker.make(Product, collection=collection, _quantity=size):
+                baker.make(ProductImage, product=product, _quantity=2)
+                baker.make(ProductReview, product=product, _quantity=3)
+
+        return make
+
+    def test_product_list_query_count_is_constant(self, assert_constant_queries):
+        collection = baker.make(Collection)
+
+        assert_constant_queries("/store/products/", self.make_products(collection))
+
+    def test_collection_product_list_query_count_is_constant(
+        self, assert_constant_queries
+    ):
+        collection = baker.make(Collection)
+
+        assert_constant_queries(
+            f"/store/collections/{collection.id}/products/",
+            self.make_products(collection),
+        )
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    @pytest.fixture(params=["locmem", "filebased"])
+    def catalogue_cache(self, request, settings, tmp_path):
+        backends = {
+            "locmem": ("django.core.cache.backends.locmem.LocMemCache", "tests"),
+            "filebased": (
+                "django.core.cache.backends.filebased.FileBasedCache",
+                str(tmp_path),
+            ),
+        }
+        backend, location = backends[request.param]
+        settings.CACHES = {
+            **settings.CACHES,
+            "catalogue": {"BACKEND": backend, "LOCATION": location},
+        }
+
+    def test_repeated_anonymous_read_is_served_from_cache(
+        self, client, catalogue_cache, django_assert_num_queries
+    ):
+        product = baker.make(Product)
+        url = f"/store/products/{product.id}/"
+        first = client.get(url)
+
+        with django_assert_num_queries(0):
+            second = client.get(url)
+
+        assert second.data == first.data
+        assert second["ETag"] == first["ETag"]
+
+    def test_saving_a_product_invalidates_the_cache(self, client, catalogue_cache):
+        product = baker.make(Product, title="Old title")
+        url = f"/store/products/{product.id}/"
+        client.get(url)
+
+        product.title = "New title"
+        product.save()
+        response = client.get(url)
+
+        assert response.data["title"] == "New title"
+
+    def test_adding_a_review_invalidates_the_list(self, client, catalogue_cache):
+        product = baker.make(Product)
+        client.get("/store/products/")
+
+        baker.make(ProductReview, product=product)
+        response = client.get("/store/products/")
+
+        assert len(response.data["results"][0]["reviews"]) == 1
+
+    def test_matching_if_none_match_returns_304(self, client, catalogue_cache):
+        product = baker.make(Product)
+        url = f"/store/products/{product.id}/"
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+
+@pytest.mark.django_db
+class TestImportProducts:
+    def test_if_user_is_not_admin_returns_403(self, client):
+        client.force_authenticate(user=baker.make(User))
+
+        response = client.post("/store/products/import/", [], format="json")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_csv_upload_creates_updates_and_reports_bad_rows(self, client):
+        collection = baker.make(Collection, title="Phones")
+        existing = baker.make(
+            Product, collection=collection, price=10, manufacturer="Samsung"
+        )
+        upload = SimpleUploadedFile(
+            "products.csv",
+            (
+                "id,title,description,price,inventory,collection\n"
+                f"{existing.id},Renamed,A longer description,99,5,Phones\n"
+                ",New phone,A longer description,50,3,Phones\n"
+                ",x,short,0,3,Phones\n"
+                ",Tablet,A longer description,50,3,Tablets\n"
+            ).encode(),
+            content_type="text/csv",
+        )
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        response = client.post("/store/products/import/", {"file": upload})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["created"] == 1
+        assert response.data["updated"] == 1
+        assert [error["row"] for error in response.data["errors"]] == [3, 4]
+        assert set(response.data["errors"][0]["errors"]) == {
+            "title",
+            "description",
+            "price",
+        }
+        existing.refresh_from_db()
+        assert (existing.title, existing.price) == ("Renamed", 99)
+        # Carts that checked stock before the import have to check again.
+        assert existing.inventory_version == 1
+        # The file has no manufacturer column, so the update leaves it alone.
+        assert existing.manufacturer == "Samsung"
+        collection.refresh_from_db()
+        assert collection.product_count == 2
+
+    def test_command_imports_ndjson(self, tmp_path):
+        baker.make(Collection, title="Phones")
+        path = tmp_path / "products.ndjson"
+        path.write_text(
+            "\n".join(
+                json.dumps(
+                    {
+                        "title": f"Phone {index}",
+                        "description": "A longer description",
+                        "price": 10,
+                        "inventory": 1,
+                        "collection": "Phones",
+                    }
+                )
+                for index in range(5)
+            )
+        )
+        out = StringIO()
+
+        call_command("import_products", str(path), batch_size=2, stdout=out)
+
+        assert "Created 5, updated 0, rejected 0" in out.getvalue()
+        assert Product.objects.count() == 5
+
+
+@pytest.mark.django_db
+class TestSearchProducts:
+    @pytest.fixture
+    def catalogue(self):
+        collection = baker.make(Collection)
+        return {
+            name: baker.make(Product, collection=collection, **fields)
+            for name, fields in {
+                "iphone": {
+                    "title": "iPhone 15 Pro",
+                    "description": "Titanium smartphone",
+                    "manufacturer": "Apple",
+                },
+                "galaxy": {
+                    "title": "Galaxy S24",
+                    "description": "Android smartphone with a great camera",
+                    "manufacturer": "Samsung",
+                },
+                "case": {
+                    "title": "Leather case",
+                    "description": "Fits the iPhone 15 Pro",
+                    "manufacturer": "Apple",
+                },
+            }.items()
+        }
+
+    def search(self, client, query):
+        response = client.get("/store/products/", {"search": query})
+        return [product["id"] for product in response.data["results"]]
+
+    def test_title_matches_rank_above_description_matches(self, client, catalogue):
+        assert self.search(client, "iphone") == [
+            catalogue["iphone"].id,
+            catalogue["case"].id,
+        ]
+
+    def test_every_term_must_match_as_a_prefix(self, client, catalogue):
+        assert self.search(client, "smart sams") == [catalogue["galaxy"].id]
+
+    def test_index_follows_product_updates(self, client, catalogue):
+        galaxy = catalogue["galaxy"]
+        galaxy.title = "Pixel 8"
+        galaxy.save()
+
+        assert self.search(client, "galaxy") == []
+        assert self.search(client, "pixel") == [galaxy.id]
+
+    def test_search_results_paginate_by_rank(self, client, catalogue):
+        first = client.get("/store/products/", {"search": "apple", "page_size": 1})
+        second = client.get(first.data["next"])
+
+        ids = [first.data["results"][0]["id"], second.data["results"][0]["id"]]
+        assert sorted(ids) == sorted([catalogue["iphone"].id, catalogue["case"].id])
+
+    @pytest.mark.parametrize("rank", [{"x": 1}, "abc", [1]])
+    def test_cursor_with_a_forged_rank_returns_404(self, client, catalogue, rank):
+        cursor = b64encode(json.dumps({"v": [rank, 1], "r": 0}).encode()).decode()
+
+        response = client.get("/store/products/", {"search": "wid", "cursor": cursor})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_rebuild_command_restores_the_index(self, client, catalogue):
+        ProductSearchToken.objects.all().delete()
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        assert self.search(client, "galaxy") == [catalogue["galaxy"].id]
+
+    def test_rebuild_keeps_every_product_searchable(self, catalogue, monkeypatch):
+        seen = []
+
+        def index_and_search(batch):
+            matches = search.search_products(Product.objects.all(), "smartphone")
+            seen.append(set(matches.values_list("id", flat=True)))
+            return search.index_products(batch)
+
+        monkeypatch.setattr(rebuild_search_index, "index_products", index_and_search)
+
+        call_command("rebuild_search_index", batch_size=1, stdout=StringIO())
+
+        expected = {catalogue["iphone"].id, catalogue["galaxy"].id}
+        assert seen == [expected] * len(catalogue)
+
+
+@pytest.mark.django_db
+class TestFilterProducts:
+    @pytest.fixture
+    def catalogue(self):
+        phones, laptops = baker.make(Collection, _quantity=2)
+        baker.make(
+            Product, collection=phones, manufacturer="Apple", price=40, inventory=5
+        )
+        baker.make(
+            Product, collection=phones, manufacturer="Samsung", price=80, inventory=5
+        )
+        baker.make(
+            Product, collection=laptops, manufacturer="Apple", price=1200, inventory=0
+        )
+        return phones, laptops
+
+    def test_filters_combine(self, client, catalogue):
+        phones, _ = catalogue
+
+        response = client.get(
+            "/store/products/",
+            {"collection_id": phones.id, "manufacturer": "Apple", "max_price": 50},
+        )
+
+        assert [product["price"] for product in response.data["results"]] == [40]
+
+    def test_in_stock_excludes_empty_inventory(self, client, catalogue):
+        response = client.get("/store/products/", {"in_stock": "true"})
+
+        assert len(response.data["results"]) == 2
+
+    def test_invalid_price_returns_400(self, client, catalogue):
+        response = client.get("/store/products/", {"min_price": "cheap"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_facets_count_filtered_products_in_one_query(self, client, catalogue):
+        phones, laptops = catalogue
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                "/store/products/", {"manufacturer": "Apple", "facets": "true"}
+            )
+
+        facets = response.data["facets"]
+        assert facets["collections"] == [
+            {"id": phones.id, "count": 1},
+            {"id": laptops.id, "count": 1},
+        ]
+        assert facets["manufacturers"] == [{"value": "Apple", "count": 2}]
+        assert [bucket["count"] for bucket in facets["price_ranges"]] == [
+            1,
+            0,
+            0,
+            0,
+            0,
+            1,
+        ]
+        grouped = [
+            query for query in context.captured_queries if "GROUP BY" in query["sql"]
+        ]
+        assert len(grouped) == 1
+
+    def test_facets_are_cached_per_filter_combination(
+        self, client, catalogue, django_assert_num_queries
+    ):
+        client.get("/store/products/", {"facets": "true", "in_stock": "1"})
+
+        with django_assert_num_queries(0):
+            client.get("/store/products/", {"in_stock": "1", "facets": "true"})
+
+
+@pytest.mark.django_db
+class TestSparseFieldsets:
+    @pytest.fixture
+    def product(self):
+        product = baker.make(Product, title="Phone")
+        baker.make(ProductImage, product=product)
+        baker.make(ProductReview, product=product)
+        return product
+
+    def test_fields_limits_the_payload(self, client, product):
+        response = client.get("/store/products/", {"fields": "id,title,price"})
+
+        assert set(response.data["results"][0]) == {"id", "title", "price"}
+
+    def test_expand_adds_nested_relations_to_sparse_fields(self, client, product):
+        response = client.get(
+            f"/store/products/{product.id}/", {"fields": "id", "expand": "images"}
+        )
+
+        assert set(response.data) == {"id", "images"}
+        assert len(response.data["images"]) == 1
+
+    def test_expand_alone_drops_relations_not_listed(self, client, product):
+        response = client.get(f"/store/products/{product.id}/", {"expand": "images"})
+
+        assert "reviews" not in response.data
+        assert "description" in response.data
+
+    def test_unrequested_columns_and_relations_are_not_loaded(self, client, product):
+        with CaptureQueriesContext(connection) as context:
+            client.get("/store/products/", {"fields": "id,title"})
+
+        assert len(context.captured_queries) == 1
+        assert "description" not in context.captured_queries[0]["sql"]
@@ -0,0 +1,138 @@
+import json
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+import pytest
+
+from store.models import Cart, CartItem, Collection, Order, OrderItem, Product
+from store.models import ProductReview
+from user.models import User
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "mysql":
+            cursor.execute("EXPLAIN FORMAT=JSON " + sql)
+            return cursor.fetchone()[0]
+        cursor.execute("EXPLAIN QUERY PLAN " + sql)
+        return "\n".join(row[-1] for row in cursor.fetchall())
+
+
+def plan_regressions(plan):
+    if connection.vendor == "mysql":
+        document = json.loads(plan)
+        return re.findall(
+            r'"access_type": "ALL"|"using_filesort": true', json.dumps(document)
+        )
+    # Latest-N prefetches wrap a ROW_NUMBER() query, which must itself be
+    # indexed, in an outer query that filters and orders its few rows.
+    plan = re.sub(
+        r"^SCAN qualify\n(USE TEMP B-TREE FOR ORDER BY$)?", "", plan, flags=re.MULTILINE
+    )
+    # SQLite reports a bare "SCAN <table>" when no index is used to read the
+    # rows ("SCAN <table> USING INDEX" walks an index in order) and a temp
+    # B-tree when the ORDER BY cannot be served by an index.
+    return re.findall(
+        r"^SCAN \w+$|USE TEMP B-TREE FOR ORDER BY", plan, re.MULTILINE
+    )
+
+
+@pytest.fixture
+def assert_indexed_plans(client):
+    def assert_indexed(url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200
+
+        selects = [
+            query["sql"]
+            for query in context.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+        assert selects
+        for sql in selects:
+            plan = explain(sql)
+            assert not plan_regressions(plan), f"{url} is not indexed:\n{sql}\n{plan}"
+
+    return assert_indexed
+
+
+@pytest.fixture
+def catalogue():
+    collection = baker.make(Collection)
+    products = baker.make(Product, collection=collection, _quantity=30)
+    for product in products:
+        baker.make(ProductReview, product=product, _quantity=2)
+    return collection, products
+
+
+@pytest.mark.django_db
+class TestCatalogueQueryPlans:
+    def test_product_list(self, assert_indexed_plans, catalogue):
+        assert_indexed_plans("/store/products/")
+
+    def test_product_list_next_page(self, assert_indexed_plans, client, catalogue):
+        next_page = client.get("/store/products/?page_size=5").data["next"]
+
+        assert_indexed_plans(next_page)
+
+    def test_top_rated_products(self, assert_indexed_plans, client, catalogue):
+        assert_indexed_plans("/store/products/?ordering=-average_rating")
+        next_page = client.get(
+            "/store/products/?ordering=-average_rating&page_size=5"
+        ).data["next"]
+
+        assert_indexed_plans(next_page)
+
+    def test_product_detail(self, assert_indexed_plans, catalogue):
+        _, products = catalogue
+
+        assert_indexed_plans(f"/store/products/{products[0].id}/")
+
+    def test_collection_products(self, assert_indexed_plans, catalogue):
+        collection, _ = catalogue
+
+        assert_indexed_plans(f"/store/collections/{collection.id}/products/")
+
+    def test_product_reviews(self, assert_indexed_plans, catalogue):
+        _, products = catalogue
+
+        assert_indexed_plans(f"/store/products/{products[0].id}/reviews/")
+
+
+@pytest.mark.django_db
+class TestOrderQueryPlans:
+    @pytest.fixture
+    def orders(self):
+        for customer in [user.customer for user in baker.make(User, _quantity=3)]:
+            for order in baker.make(Order, customer=customer, _quantity=5):
+                baker.make(OrderItem, order=order, _quantity=2)
+
+    def test_staff_order_list(self, assert_indexed_plans, client, orders):
+        client.force_authenticate(user=baker.make(User, is_staff=True))
+
+        assert_indexed_plans("/store/orders/")
+
+    def test_customer_order_list(self, assert_indexed_plans, client, orders):
+        customer = Order.objects.first().customer
+        client.force_authenticate(user=customer.user)
+
+        assert_indexed_plans("/store/orders/")
+
+    def test_order_items(self, assert_indexed_plans, client, orders):
+        order = Order.objects.first()
+        client.force_authenticate(user=order.customer.user)
+
+        assert_indexed_plans(f"/store/orders/{order.id}/items/")
+
+
+@pytest.mark.django_db
+class TestCartQueryPlans:
+    def test_cart_detail(self, assert_indexed_plans):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, quantity=1, _quantity=5)
+        baker.make(CartItem, quantity=1, _quantity=5)
+
+        assert_indexed_plans(f"/store/carts/{cart.id}/")
@@ -0,0 +1,227 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework import status
+import pytest
+
+from store.models import Product, ProductReview
+
+
+def post_review(client, product, rating):
+    return client.post(
+        f"/store/products/{product.id}/reviews/",
+        {"customer_name": "Ada", "description": "Good", "rating": rating},
+    )
+
+
+def stats(product):
+    product.refresh_from_db()
+    return product.review_count, product.average_rating
+
+
+@pytest.mark.django_db
+class TestReviewAggregates:
+    def test_creating_reviews_updates_count_and_average(self, client):
+        product = baker.make(Product)
+
+        post_review(client, product, 5)
+        post_review(client, product, 4)
+        baker.make(ProductReview, product=product, rating=None)
+
+        assert stats(product) == (3, 4.5)
+
+    def test_editing_and_deleting_reviews_updates_the_average(self, client):
+        product = baker.make(Product)
+        first = post_review(client, product, 5).data["id"]
+        post_review(client, product, 1)
+        url = f"/store/products/{product.id}/reviews/{first}/"
+
+        client.patch(url, {"rating": 3})
+        assert stats(product) == (2, 2.0)
+
+        client.delete(url)
+        assert stats(product) == (1, 1.0)
+
+        client.delete(
+            f"/store/products/{product.id}/reviews/{ProductReview.objects.get().id}/"
+        )
+        assert stats(product) == (0, 0)
+
+    def test_saving_a_product_loaded_earlier_keeps_new_reviews(self, client):
+        product = baker.make(Product)
+        loaded = Product.objects.get(pk=product.pk)
+        post_review(client, product, 4)
+
+        loaded.title = "Renamed"
+        loaded.save()
+
+        assert stats(product) == (1, 4.0)
+        assert product.title == "Renamed"
+
+    @pytest.mark.parametrize("rating", [None, 0, 6])
+    def test_if_rating_is_invalid_returns_400(self, client, rating):
+        product = baker.make(Product)
+
+        response = client.post(
+            f"/store/products/{product.id}/reviews/",
+            {"customer_name": "Ada", "description": "Good", "rating": rating or ""},
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "rating" in response.data
+
+    def test_recount_command_repairs_drift(self):
+        product = baker.make(Product)
+        baker.make(ProductReview, product=product, rating=2)
+        baker.make(ProductReview, product=product, rating=5)
+        baker.make(ProductReview, product=product, rating=None)
+        unreviewed = baker.make(Product)
+        Product.objects.update(review_count=9, rating_count=9, average_rating=1)
+
+        call_command("recount_product_reviews")
+
+        assert stats(product) == (3, 3.5)
+        assert stats(unreviewed) == (0, 0)
+
+
+@pytest.mark.django_db
+class TestTopRated:
+    @pytest.fixture
+    def products(self):
+        products = baker.make(Product, _quantity=4)
+        for product, ratings in zip(products, [[3], [5, 4], [5], []]):
+            for rating in ratings:
+                baker.make(ProductReview, product=product, rating=rating)
+        return products
+
+    def test_orders_by_average_rating_then_review_count(self, client, products):
+        response = client.get("/store/products/", {"ordering": "-average_rating"})
+
+        results = response.data["results"]
+        assert [item["id"] for item in results] == [
+            products[index].id for index in (2, 1, 0, 3)
+        ]
+        assert [item["average_rating"] for item in results] == [5, 4.5, 3, 0]
+
+    def test_ordering_pages_with_the_cursor(self, client, products):
+        first = client.get(
+            "/store/products/", {"ordering": "-average_rating", "page_size": 2}
+        )
+        second = client.get(first.data["next"])
+
+        ids = [item["id"] for item in first.data["results"] + second.data["results"]]
+        assert ids == [products[index].id for index in (2, 1, 0, 3)]
+
+    def test_orders_by_review_count(self, client, products):
+        response = client.get("/store/products/", {"ordering": "-review_count"})
+
+        assert response.data["results"][0]["id"] == products[1].id
+        assert response.data["results"][0]["review_count"] == 2
+
+    def test_if_ordering_is_unknown_returns_400(self, client, products):
+        response = client.get("/store/products/", {"ordering": "price"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "ordering" in response.data
+
+
+@pytest.mark.django_db
+class TestReviewPages:
+    def test_reviews_in_the_same_millisecond_are_not_skipped(self, client):
+        product = baker.make(Product)
+        created = timezone.now().replace(microsecond=123000)
+        reviews = baker.make(ProductReview, product=product, _quantity=4)
+        for offset, review in enumerate(reviews):
+            ProductReview.objects.filter(pk=review.pk).update(
+                date_created=created + timedelta(microseconds=offset * 100)
+            )
+
+        ids = []
+        url = f"/store/products/{product.id}/reviews/?page_size=1"
+        while url:
+            response = client.get(url)
+            ids += [review["id"] for review in response.data["results"]]
+            url = response.data["next"]
+
+        assert ids == [review.id for review in reversed(reviews)]
+
+
+@pytest.mark.django_db
+class TestEmbeddedReviews:
+    @pytest.fixture
+    def products(self):
+        products = baker.make(Product, _quantity=3)
+        now = timezone.now()
+        for product in products:
+            for days_ago in (3, 1, 4, 2, 5):
+                review = baker.make(ProductReview, product=product, rating=None)
+                ProductReview.objects.filter(pk=review.pk).update(
+                    date_created=now - timedelta(days=days_ago)
+                )
+        return products
+
+    def newest_ids(self, product, count):
+        return list(
+            product.reviews.order_by("-date_created", "-id").values_list(
+                "id", flat=True
+            )[:count]
+        )
+
+    def test_list_embeds_newest_reviews_and_links_to_the_rest(
+        self, client, settings, products
+    ):
+        settings.STORE_EMBEDDED_REVIEWS = 3
+
+        response = client.get("/store/products/")
+
+        results = {item["id"]: item for item in response.data["results"]}
+        for product in products:
+            item = results[product.id]
+            assert [review["id"] for review in item["reviews"]] == self.newest_ids(
+                product, 3
+            )
+            assert item["reviews_url"] == (
+                f"http://testserver/store/products/{product.id}/reviews/"
+            )
+        first_page = client.get(response.data["results"][0]["reviews_url"])
+        assert [review["id"] for review in first_page.data["results"][:3]] == [
+            review["id"] for review in response.data["results"][0]["reviews"]
+        ]
+
+    def test_reviews_for_a_page_are_read_in_one_query(
+        self, client, settings, products
+    ):
+        settings.STORE_EMBEDDED_REVIEWS = 3
+
+        with CaptureQueriesContext(connection) as context:
+            client.get("/store/products/")
+
+        review_queries = [
+            query
+            for query in context.captured_queries
+            if "store_productreview" in query["sql"]
+        ]
+        assert len(review_queries) == 1
+
+    def test_detail_embeds_newest_reviews(self, client, settings, products):
+        settings.STORE_EMBEDDED_REVIEWS = 2
+        product = products[0]
+
+        response = client.get(f"/store/products/{product.id}/")
+
+        assert [review["id"] for review in response.data["reviews"]] == (
+            self.newest_ids(product, 2)
+        )
+        assert response.data["review_count"] == 5
+
+    def test_unset_limit_embeds_every_review(self, client, settings, products):
+        settings.STORE_EMBEDDED_REVIEWS = None
+
+        response = client.get(f"/store/products/{products[0].id}/")
+
+        assert len(response.data["reviews"]) == 5
+        assert "reviews_url" not in response.data
@@ -0,0 +1,141 @@
+import sqlite3
+
+from django.db import connections
+from model_bakery import baker
+import pytest
+
+from store import routers
+from store.models import Order, Product
+from user.models import User
+
+
+def add_replica(alias, name):
+    connections.settings[alias] = {**connections.settings["default"], "NAME": name}
+    connection = connections[alias]
+
+    # The test case only lets its own databases connect; open this one the
+    # way BaseDatabaseWrapper.ensure_connection() does.
+    def ensure_connection():
+        if connection.connection is None:
+            with connection.wrap_database_errors:
+                connection.connect()
+
+    connection.ensure_connection = ensure_connection
+
+
+def remove_replica(alias):
+    if alias in connections:
+        connections[alias].close()
+        del connections[alias]
+    connections.settings.pop(alias, None)
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """
+    A second SQLite database holding a copy of the primary taken when the
+    fixture's snapshot() is called, like a replica that has stopped applying
+    changes.
+    """
+    path = tmp_path / "replica.sqlite3"
+    add_replica("replica", str(path))
+    settings.DATABASE_READ_REPLICAS = ["replica"]
+
+    def snapshot():
+        primary = connections["default"]
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+
+    yield snapshot
+    remove_replica("replica")
+    routers._replica_down_until.clear()
+
+
+@pytest.fixture
+def product(replica):
+    product = baker.make(Product, title="On the replica")
+    replica()
+    Product.objects.filter(pk=product.pk).update(title="On the primary")
+    return product
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaRouting:
+    def test_catalogue_reads_use_the_replica(self, client, product):
+        response = client.get(f"/store/products/{product.id}/")
+
+        assert response.status_code == 200
+        assert response.data["title"] == "On the replica"
+
+    def test_replica_is_chosen_once_per_request(self, client, product, monkeypatch):
+        healthy_replica = routers.healthy_replica
+        calls = []
+
+        def count_calls():
+            calls.append(None)
+            return healthy_replica()
+
+        monkeypatch.setattr(routers, "healthy_replica", count_calls)
+
+        response = client.get(f"/store/products/{product.id}/")
+
+        assert response.data["title"] == "On the replica"
+        assert len(calls) == 1
+
+    def test_reads_outside_opted_in_views_use_the_primary(self, product):
+        assert Product.objects.get(pk=product.pk).title == "On the primary"
+
+    def test_writes_pin_the_client_to_the_primary(self, client, product):
+        response = client.post("/store/carts/")
+
+        assert response.status_code == 201
+        assert routers.PIN_COOKIE in response.cookies
+        response = client.get(f"/store/products/{product.id}/")
+        assert response.data["title"] == "On the primary"
+
+    def test_safe_requests_do_not_set_the_pin(self, client, product):
+        response = client.get(f"/store/products/{product.id}/")
+
+        assert routers.PIN_COOKIE not in response.cookies
+
+    def test_exports_read_from_the_replica(self, client, replica):
+        user = baker.make(User, is_staff=True)
+        baker.make(Order, customer=user.customer)
+        replica()
+        baker.make(Order, customer=user.customer)
+        client.force_authenticate(user=user)
+
+        response = client.get("/store/orders/export/")
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        assert len(lines) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestReplicaFallback:
+    def test_unreachable_replica_falls_back_to_the_primary(
+        self, client, settings, tmp_path
+    ):
+        add_replica("broken", str(tmp_path / "missing" / "replica.sqlite3"))
+        settings.DATABASE_READ_REPLICAS = ["broken"]
+        product = baker.make(Product, title="On the primary")
+        try:
+            response = client.get(f"/store/products/{product.id}/")
+            assert response.status_code == 200
+            assert response.data["title"] == "On the primary"
+            assert "broken" in routers._replica_down_until
+        finally:
+            remove_replica("broken")
+            routers._replica_down_until.clear()
+
+    def test_unconfigured_replica_alias_is_ignored(self, client, settings):
+        settings.DATABASE_READ_REPLICAS = ["nowhere"]
+        product = baker.make(Product)
+
+        response = client.get(f"/store/products/{product.id}/")
+
+        assert response.status_code == 200
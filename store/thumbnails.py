@@ -0,0 +1,176 @@
+"""
+Resized variants of product images.
+
+Saving a ProductImage schedules `generate_variants` once the transaction
+commits. It runs on a small in-process thread pool, so no broker is needed.
+Variants are written next to the original in the image's storage. Their
+names are recorded on `ProductImage.variants`, and the serializers expose
+them as URLs plus srcset strings.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from store.caching import invalidate_catalogue
+from store.models import ProductImage
+
+logger = logging.getLogger(__name__)
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True},
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths():
+    return sorted(getattr(settings, "STORE_IMAGE_VARIANT_WIDTHS", (160, 320, 640)))
+
+
+def variant_formats():
+    return tuple(getattr(settings, "STORE_IMAGE_VARIANT_FORMATS", ("webp", "jpeg")))
+
+
+def target_widths(original_width):
+    # Never upscale; an image narrower than every size gets one variant at
+    # its own width so it is still re-encoded and compressed.
+    widths = [width for width in variant_widths() if width < original_width]
+    return widths or [original_width]
+
+
+def variant_name(name, width, variant_format):
+    root, _ = os.path.splitext(name)
+    return f"{root}_{width}w.{EXTENSIONS[variant_format]}"
+
+
+def encode(image, variant_format):
+    if variant_format == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    buffer = BytesIO()
+    image.save(buffer, **SAVE_OPTIONS[variant_format])
+    return buffer.getvalue()
+
+
+def render_variants(field_file):
+    """
+    Yield (format, width, bytes) for every variant of an image file.
+    """
+    with field_file.open("rb") as source, Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        for width in target_widths(original.width):
+            height = max(1, round(original.height * width / original.width))
+            resized = original.resize((width, height), Image.LANCZOS)
+            for variant_format in variant_formats():
+                yield variant_format, width, encode(resized, variant_format)
+
+
+def delete_variants(storage, variants):
+    for variant in variants:
+        storage.delete(variant["name"])
+
+
+def generate_variants(image_id):
+    """
+    (Re)build the variants of one ProductImage and record them. Returns the
+    number of files written.
+    """
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return 0
+
+    storage = image.image.storage
+    variants = []
+    for variant_format, width, content in render_variants(image.image):
+        name = variant_name(image.image.name, width, variant_format)
+        storage.delete(name)
+        name = storage.save(name, ContentFile(content))
+        variants.append({"format": variant_format, "width": width, "name": name})
+
+    stale = [variant for variant in image.variants if variant not in variants]
+    delete_variants(storage, stale)
+    # update() rather than save(): saving would schedule this job again.
+    ProductImage.objects.filter(pk=image_id, image=image.image.name).update(
+        variants=variants
+    )
+    invalidate_catalogue()
+    return len(variants)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "STORE_IMAGE_WORKERS", 2),
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def build_variants(image_id):
+    """
+    generate_variants() that logs failures instead of raising them; returns
+    None for an image that failed.
+    """
+    try:
+        return generate_variants(image_id)
+    except Exception:
+        logger.exception("Could not build variants of product image %s", image_id)
+        return None
+
+
+def run_job(image_id):
+    # Pool threads keep their own connections open between jobs.
+    close_old_connections()
+    try:
+        return build_variants(image_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(image_id):
+    """
+    Generate the variants of an image after the current transaction commits,
+    in the background unless STORE_IMAGE_VARIANTS_EAGER is set.
+    """
+    if getattr(settings, "STORE_IMAGE_VARIANTS_EAGER", False):
+        transaction.on_commit(lambda: generate_variants(image_id))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(run_job, image_id))
+
+
+def variant_urls(variants, url):
+    """
+    Return the variants as {"format", "width", "url"}, by format then width.
+    `url` maps a storage name to a URL.
+    """
+    ordered = sorted(variants, key=lambda item: (item["format"], item["width"]))
+    return [
+        {
+            "format": variant["format"],
+            "width": variant["width"],
+            "url": url(variant["name"]),
+        }
+        for variant in ordered
+    ]
+
+
+def srcsets(urls):
+    """Build one `srcset` attribute value per format from variant_urls()."""
+    entries = defaultdict(list)
+    for variant in urls:
+        entries[variant["format"]].append(f"{variant['url']} {variant['width']}w")
+    return {name: ", ".join(candidates) for name, candidates in entries.items()}
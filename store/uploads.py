@@ -0,0 +1,96 @@
+"""
+Streaming image uploads.
+
+ImageUploadParser parses multipart bodies with ImageUploadHandler only. The
+handler writes each file to a temporary file in 64 KB chunks, so memory use
+does not grow with the upload size. It also checks the type and size while
+the bytes arrive, instead of after the whole file has been received.
+FileSystemStorage then moves the temporary file into place rather than
+copying it.
+"""
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+
+from store.validators import FILE_SIZE_MESSAGE, MAX_FILE_SIZE_KB
+
+MAX_UPLOAD_SIZE = MAX_FILE_SIZE_KB * 1024
+# Room for the multipart boundaries, headers and ordinary form fields around
+# the file when the request's Content-Length is checked up front.
+MULTIPART_OVERHEAD = 64 * 1024
+
+SNIFF_BYTES = 12
+INVALID_IMAGE_MESSAGE = (
+    "Upload a valid image. The file you uploaded was either not an image or a "
+    "corrupted image."
+)
+
+
+def looks_like_image(header):
+    """Check the leading bytes of a file against the formats we accept."""
+    return (
+        header.startswith(b"\xff\xd8\xff")  # JPEG
+        or header.startswith(b"\x89PNG\r\n\x1a\n")
+        or header[:6] in (b"GIF87a", b"GIF89a")
+        or (header[:4] == b"RIFF" and header[8:12] == b"WEBP")
+    )
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded files to disk and stops the upload as soon as a file is
+    too big or does not start like an image. The reason is kept in `errors`.
+    """
+
+    def __init__(self, request=None, max_size=MAX_UPLOAD_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.errors = {}
+
+    def new_file(self, field_name, file_name, content_type, content_length, *args):
+        super().new_file(field_name, file_name, content_type, content_length, *args)
+        self.header = b""
+        if content_length is not None and content_length > self.max_size:
+            self.reject(FILE_SIZE_MESSAGE)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject(FILE_SIZE_MESSAGE)
+        if len(self.header) < SNIFF_BYTES:
+            self.header += raw_data[: SNIFF_BYTES - len(self.header)]
+            if len(self.header) == SNIFF_BYTES and not looks_like_image(self.header):
+                self.reject(INVALID_IMAGE_MESSAGE)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not looks_like_image(self.header):
+            self.reject(INVALID_IMAGE_MESSAGE)
+        return super().file_complete(file_size)
+
+    def reject(self, message):
+        self.errors[self.field_name] = [message]
+        # Discard the rest of the body without storing it.
+        raise StopUpload(connection_reset=False)
+
+
+class ImageUploadParser(MultiPartParser):
+    """
+    MultiPartParser for image uploads: rejects bodies that are too large from
+    the Content-Length alone and streams the rest through ImageUploadHandler.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+            raise ValidationError({"image": [FILE_SIZE_MESSAGE]})
+
+        handler = ImageUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        result = super().parse(stream, media_type, parser_context)
+        if handler.errors:
+            raise ValidationError(handler.errors)
+        return result
@@ -1,5 +1,13 @@
+from django.urls import path
 from rest_framework_nested import routers
 
+from store.async_views import (
+    CartDetailView,
+    CartItemCreateView,
+    ProductDetailView,
+    ProductListView,
+)
+
 from store.views import (
     AddressViewSet,
     CartItemViewSet,
@@ -12,6 +20,7 @@ from store.views import (
     ProductViewSet,
     ProductImageViewSet,
     CollectionProductViewSet,
+    metrics,
 )
 
 
@@ -50,4 +59,19 @@ urlpatterns = (
     + customer_router.urls
     + product_router.urls
     + collection_router.urls
+    + [path("metrics/", metrics, name="metrics")]
+    + [
+        path("async/products/", ProductListView.as_view(), name="async-products"),
+        path(
+            "async/products/<int:pk>/",
+            ProductDetailView.as_view(),
+            name="async-product-detail",
+        ),
+        path("async/carts/<str:pk>/", CartDetailView.as_view(), name="async-carts"),
+        path(
+            "async/carts/<str:cart_pk>/items/",
+            CartItemCreateView.as_view(),
+            name="async-cart-items",
+        ),
+    ]
 )
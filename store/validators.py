@@ -1,7 +1,9 @@
 from django.core.exceptions import ValidationError
 
+MAX_FILE_SIZE_KB = 2000
+FILE_SIZE_MESSAGE = f"Uploaded file cannot be larger than {MAX_FILE_SIZE_KB}kb"
+
 
 def validate_file_size(file):
-    max_size_kb = 2000
-    if file.size > max_size_kb * 1024:
-        raise ValidationError(f"Uploaded file cannot be larger than {max_size_kb}kb")
+    if file.size > MAX_FILE_SIZE_KB * 1024:
+        raise ValidationError(FILE_SIZE_MESSAGE)
@@ -1,9 +1,12 @@
 from django.shortcuts import render
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from django.db import transaction
+from django.http import HttpResponse
 
-from django.db.models import Count
+from rest_framework.parsers import JSONParser
 from rest_framework.mixins import (
     CreateModelMixin,
     RetrieveModelMixin,
@@ -46,19 +49,44 @@ from store.serializers import (
     UpdateCartItemSerializer,
     UpdateOrderSerializer,
 )
+from store.caching import CatalogueCacheMixin
+from store.carts import apply_cart_delta
+from store.exports import export_order_items, export_orders
+from store.fast import (
+    CartReader,
+    CollectionReader,
+    FastReadMixin,
+    FastRetrieveMixin,
+    OrderReader,
+    ProductReader,
+)
+from store.filters import (
+    TRUE_VALUES,
+    ProductFilter,
+    product_facets,
+    product_ordering,
+)
+from store.imports import INPUT_FORMATS, guess_format, import_products, read_rows
+from store.inventory import release
+from store.metrics import format_prometheus, registry
+from store.pagination import KeysetPagination
+from store.prefetch import SerializerPrefetchMixin
+from store.routers import ReplicaReadMixin
+from store.search import SEARCH_PARAM, ProductSearchFilter
+from store.uploads import ImageUploadParser
+
+
+class CollectionViewSet(
+    ReplicaReadMixin, CatalogueCacheMixin, FastReadMixin, ModelViewSet
+):
+    fast_reader = CollectionReader
 
-
-class CollectionViewSet(ModelViewSet):
     def get_permissions(self):
         if self.request.method in ["GET", "HEAD", "OPTIONS"]:
             return [AllowAny()]
         return [IsAdminUser()]
 
-    queryset = (
-        Collection.objects.annotate(product_count=Count("products"))
-        .prefetch_related("products")
-        .all()
-    )
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
 
     def destroy(self, request, *args, **kwargs):
@@ -71,34 +99,81 @@ class CollectionViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class CollectionProductViewSet(ModelViewSet):
+class CollectionProductViewSet(
+    ReplicaReadMixin, CatalogueCacheMixin, SerializerPrefetchMixin, ModelViewSet
+):
+    pagination_class = KeysetPagination
+
     def get_queryset(self):
-        return Product.objects.select_related("collection").filter(
-            collection_id=self.kwargs["collection_pk"]
-        )
+        return Product.objects.filter(collection_id=self.kwargs["collection_pk"])
 
     serializer_class = ProductSerializer
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(
+    ReplicaReadMixin,
+    CatalogueCacheMixin,
+    FastReadMixin,
+    SerializerPrefetchMixin,
+    ModelViewSet,
+):
+    fast_reader = ProductReader
     http_method_names = ["get", "patch", "put", "post", "delete", "head", "options"]
+    pagination_class = KeysetPagination
     # def get_permissions(self):
     #     if self.request.method in ["GET", "HEAD", "OPTIONS"]:
     #         return [AllowAny()]
     #     return [IsAdminUser()]
 
-    queryset = (
-        Product.objects.select_related("collection")
-        .prefetch_related("images")
-        .order_by("title")
-        .all()
-    )
+    queryset = Product.objects.order_by("title").all()
+    filter_backends = [ProductFilter, ProductSearchFilter]
+
+    def get_keyset_ordering(self, ordering):
+        if self.request.query_params.get(SEARCH_PARAM):
+            return ("-search_rank", "id")
+        return product_ordering(self.request.query_params, ordering)
 
     def get_serializer_class(self):
         if self.request.method == "PATCH":
             return PatchProductSerializer
         return ProductSerializer
 
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.request.query_params.get("facets", "").lower() in TRUE_VALUES:
+            queryset = self.filter_queryset(self.get_queryset())
+            response.data["facets"] = product_facets(
+                queryset.select_related(None).prefetch_related(None)
+            )
+        return response
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[IsAdminUser],
+        url_path="import",
+    )
+    def import_products(self, request):
+        if "file" in request.FILES:
+            upload = request.FILES["file"]
+            input_format = request.query_params.get("input") or guess_format(
+                upload.name
+            )
+            if input_format not in INPUT_FORMATS:
+                return Response(
+                    {"input": f"Choose one of {', '.join(INPUT_FORMATS)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            rows = read_rows(upload, input_format)
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response(
+                {"file": "Upload a file or send a JSON list of products."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(import_products(rows))
+
     def destroy(self, request, *args, **kwargs):
         if OrderItem.objects.filter(product_id=self.kwargs["pk"]).count() > 0:
             return Response(
@@ -109,7 +184,9 @@ class ProductViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ProductImageViewSet(ModelViewSet):
+class ProductImageViewSet(ReplicaReadMixin, ModelViewSet):
+    parser_classes = [ImageUploadParser, JSONParser]
+
     def get_permissions(self):
         if self.request.method in ["GET", "HEAD", "OPTIONS"]:
             return [AllowAny()]
@@ -126,7 +203,9 @@ class ProductImageViewSet(ModelViewSet):
     serializer_class = ProductImageSerializer
 
 
-class ProductReviewViewSet(ModelViewSet):
+class ProductReviewViewSet(ReplicaReadMixin, ModelViewSet):
+    pagination_class = KeysetPagination
+
     def get_queryset(self):
         return ProductReview.objects.select_related("product").filter(
             product_id=self.kwargs["product_pk"]
@@ -171,9 +250,11 @@ class CustomerViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class OrderViewSet(ModelViewSet):
+class OrderViewSet(FastReadMixin, ModelViewSet):
+    fast_reader = OrderReader
     http_method_names = ["get", "patch", "post", "delete", "head", "options"]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -198,9 +279,23 @@ class OrderViewSet(ModelViewSet):
 
         return Response(serializer.data)
 
+    @action(detail=False, methods=["GET"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        return export_orders(request.query_params)
+
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=[IsAdminUser],
+        url_path="export/items",
+    )
+    def export_items(self, request):
+        return export_order_items(request.query_params)
+
 
 class OrderItemViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return (
@@ -222,13 +317,19 @@ class AddressViewSet(ModelViewSet):
 
 
 class CartViewSet(
-    CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet
+    FastRetrieveMixin,
+    SerializerPrefetchMixin,
+    CreateModelMixin,
+    RetrieveModelMixin,
+    DestroyModelMixin,
+    GenericViewSet,
 ):
-    queryset = Cart.objects.prefetch_related("items").all()
+    queryset = Cart.objects.all()
     serializer_class = CartSerializer
+    fast_reader = CartReader
 
 
-class CartItemViewSet(ModelViewSet):
+class CartItemViewSet(SerializerPrefetchMixin, ModelViewSet):
     http_method_names = ["get", "post", "patch", "delete"]
 
     def get_queryset(self):
@@ -247,3 +348,18 @@ class CartItemViewSet(ModelViewSet):
 
     def get_serializer_context(self):
         return {"cart_id": self.kwargs["cart_pk"]}
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            release(instance.cart_id, instance.product_id)
+            apply_cart_delta(instance.cart_id, -instance.quantity, instance.product.price)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    return HttpResponse(
+        format_prometheus(registry.snapshot(), registry.counter_values()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )